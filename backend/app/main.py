@@ -1,27 +1,37 @@
 from threading import Thread
+import asyncio
 import base64
 import json
 import logging
 import os
 import re
 import secrets
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from backend.app.db import Base, engine, get_db
+from backend.app.db import Base, SessionLocal, engine, get_db
 from backend.app.models import Chat, DocumentBadge, Message, Session as AuthSession, User
 from backend.app.security import hash_password, verify_password
 from backend.services.llm_service import (
     get_llm_service,
+    get_llm_batching_stats,
+    get_llm_cancellation_stats,
     get_llm_info,
+    get_llm_prefix_cache_stats,
     is_llm_ready,
     is_llm_enabled,
+    llm_generation_capacity,
+    register_prompt_prefix,
 )
 from backend.services.document_templates import (
     list_templates,
@@ -30,6 +40,9 @@ from backend.services.document_templates import (
     render_pdf_from_html,
 )
 from backend.services.ocr_service import extract_text
+from backend.services.admission import AdmissionController, AdmissionRejected
+from backend.services.answer_cache import AnswerCache, context_key, history_hash
+from backend.services.context_packer import pack_context
 from backend.services.retrieval_service import get_retrieval_service
 from backend.services.risk_engine import analyze_risks
 from backend.services.translation_service import translate_to_english, translate_to_urdu, translate_text
@@ -51,6 +64,65 @@ SESSION_TTL_HOURS = int(os.getenv("SESSION_TTL_HOURS", "168"))
 HISTORY_LIMIT = 6
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
 REFERRAL_SCORE_THRESHOLD = float(os.getenv("REFERRAL_SCORE_THRESHOLD", "0.2"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "700"))
+CONTEXT_CANDIDATES = int(os.getenv("RAG_CONTEXT_CANDIDATES", "6"))
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+# Fixed prompt preambles; the LLM keeps their prefilled KV cache so each request only prefills what follows.
+RAG_INSTRUCTIONS = (
+    "Answer the question using ONLY the context below. "
+    "If the context does not contain the answer, say you don't have enough information. "
+    "Do not provide legal advice. "
+    "Respond ONLY in English. Do not use Urdu.\n\n"
+)
+SUMMARY_INSTRUCTIONS = (
+    "You are a legal assistant for Pakistan. "
+    "Explain the document below in simple, plain language for a non-expert. "
+    "Focus on: parties, obligations, payments, deadlines, termination, penalties, and key risks. "
+    "Do not provide legal advice. Use short paragraphs and '-' bullets. "
+    "Format the response with these headings in order (no duplicates): "
+    "Summary:, Key Clauses:, Key Risks:. "
+    "Summary should be 2-4 sentences. "
+    "Key Clauses and Key Risks should be bullet lists. "
+    "Omit empty sections. End with a complete sentence (no truncation).\n\n"
+    "Document excerpt:\n"
+)
+POLISH_INSTRUCTIONS = (
+    "Improve clarity and consistency of the document below without adding, removing, or reordering clauses. "
+    "Preserve headings and line breaks. Do not add legal advice. Respond ONLY in English.\n\n"
+    "Document:\n"
+)
+register_prompt_prefix("rag_answer", RAG_INSTRUCTIONS)
+register_prompt_prefix("document_summary", SUMMARY_INSTRUCTIONS)
+register_prompt_prefix("document_polish", POLISH_INSTRUCTIONS)
+
+ANSWER_CACHE = AnswerCache(
+    max_size=int(os.getenv("RAG_ANSWER_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600")),
+    similarity=float(os.getenv("RAG_ANSWER_CACHE_SIMILARITY", "0")),
+)
+# Unset, the LLM slot count follows LLM_BATCH_SIZE so admitted requests can fill the continuous batch.
+LLM_CAPACITY = llm_generation_capacity()
+LLM_ADMISSION = AdmissionController(
+    "LLM",
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY") or LLM_CAPACITY),
+    max_queue_depth=int(os.getenv("LLM_MAX_QUEUE", "32")),
+    per_user_limit=int(os.getenv("LLM_PER_USER_LIMIT", "2")),
+    # A document review can hold a slot for minutes; capping that class keeps a slot free for chat.
+    class_limits={"batch": int(os.getenv("LLM_BATCH_CONCURRENCY", "1"))},
+)
+if LLM_ADMISSION.max_concurrency < LLM_CAPACITY:
+    logger.warning(
+        "LLM_MAX_CONCURRENCY=%s admits fewer requests than the LLM runs at once (%s); batches will not fill.",
+        LLM_ADMISSION.max_concurrency,
+        LLM_CAPACITY,
+    )
+WHISPER_ADMISSION = AdmissionController(
+    "transcription",
+    max_concurrency=int(os.getenv("WHISPER_MAX_CONCURRENCY", "1")),
+    max_queue_depth=int(os.getenv("WHISPER_MAX_QUEUE", "8")),
+    per_user_limit=int(os.getenv("WHISPER_PER_USER_LIMIT", "1")),
+)
 
 EXPLICIT_REFERRAL_PATTERNS = [
     r"\bneed\s+(a\s+)?lawyer\b",
@@ -197,11 +269,41 @@ def llm_info():
     return get_llm_info()
 
 
+@app.get("/llm/batching")
+def llm_batching():
+    return get_llm_batching_stats()
+
+
+@app.get("/llm/prefix-cache")
+def llm_prefix_cache():
+    return get_llm_prefix_cache_stats()
+
+
+@app.get("/llm/cancellations")
+def llm_cancellations():
+    return get_llm_cancellation_stats()
+
+
+@app.get("/llm/queue")
+def llm_queue():
+    return {**LLM_ADMISSION.stats(), "llm_capacity": LLM_CAPACITY}
+
+
+@app.get("/audio/queue")
+def audio_queue():
+    return WHISPER_ADMISSION.stats()
+
+
 class ChatTurn(BaseModel):
     role: Literal["user", "assistant"]
     content: str = Field(..., min_length=1)
 
 
+class RagFilters(BaseModel):
+    domain: Optional[List[str]] = None
+    law_name: Optional[List[str]] = None
+
+
 class RagQueryRequest(BaseModel):
     query: str = Field(..., min_length=3)
     top_k: int = Field(2, ge=1, le=10)
@@ -209,6 +311,9 @@ class RagQueryRequest(BaseModel):
     language: str = Field("en", pattern="^(en|ur)$")
     history: Optional[List[ChatTurn]] = None
     chat_id: Optional[str] = None
+    search_mode: Optional[str] = Field(None, pattern="^(exact|ivf|hybrid)$")
+    filters: Optional[RagFilters] = None
+    rerank: Optional[bool] = None
 
 
 class SignupRequest(BaseModel):
@@ -519,7 +624,8 @@ def _needs_referral(matches: List[dict], answer: str, query: str = "") -> bool:
             return True
     if not matches:
         return True
-    top_score = matches[0].get("score") or 0.0
+    # Reranking and context packing reorder matches, so the first one need not carry the best retrieval score.
+    top_score = max(match.get("score") or 0.0 for match in matches)
     if top_score < REFERRAL_SCORE_THRESHOLD:
         return True
     lowered = (answer or "").lower()
@@ -551,6 +657,52 @@ def _referral_intro(language: str) -> str:
     return "I'm not able to fully help here, but I can refer you to a legal expert."
 
 
+def _admission_error(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=exc.status_code,
+        detail=exc.detail,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _check_admission(controller: AdmissionController, priority: str, user_key: Optional[str]) -> None:
+    try:
+        controller.check(priority, user_key)
+    except AdmissionRejected as exc:
+        raise _admission_error(exc) from exc
+
+
+@asynccontextmanager
+async def _admitted(controller: AdmissionController, priority: str, user_key: Optional[str]):
+    try:
+        async with controller.slot(priority, user_key) as wait_ms:
+            yield wait_ms
+    except AdmissionRejected as exc:
+        raise _admission_error(exc) from exc
+
+
+async def _cancel_on_disconnect(http_request: Request, awaitable):
+    # Starlette keeps running a handler after its client leaves; cancelling the task stops the generation under it.
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+def _client_key(current_user: Optional[User], http_request: Request) -> Optional[str]:
+    if current_user is not None:
+        return f"user:{current_user.id}"
+    return f"ip:{http_request.client.host}" if http_request.client else None
+
+
 def _create_session(db: Session, user_id: str) -> str:
     session_id = secrets.token_urlsafe(32)
     expires_at = datetime.now(timezone.utc) + timedelta(hours=SESSION_TTL_HOURS)
@@ -705,6 +857,7 @@ def me(current_user: User = Depends(get_current_user)):
 
 @app.post("/documents/review", response_model=DocumentReviewResponse)
 async def review_document(
+    http_request: Request,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -713,6 +866,7 @@ async def review_document(
     _validate_upload(file.filename)
     data = await file.read()
     _ensure_size_limit(len(data))
+    _check_admission(LLM_ADMISSION, "batch", f"user:{current_user.id}")
 
     text = extract_text(file.filename, data)
     if not text:
@@ -721,7 +875,8 @@ async def review_document(
         raise HTTPException(status_code=503, detail="LLM is disabled")
 
     llm = get_llm_service()
-    analysis = await analyze_risks(text, llm)
+    async with _admitted(LLM_ADMISSION, "batch", f"user:{current_user.id}"):
+        analysis = await _cancel_on_disconnect(http_request, analyze_risks(text, llm))
     response = DocumentReviewResponse(
         risky_clauses=_normalize_clauses(analysis.get("risky_clauses")),
         compliance_issues=_normalize_issues(analysis.get("compliance_issues")),
@@ -757,6 +912,7 @@ async def review_document(
 
 @app.post("/documents/summarize", response_model=DocumentSummaryResponse)
 async def summarize_document(
+    http_request: Request,
     file: UploadFile = File(...),
     language: str = Form("en"),
     current_user: User = Depends(get_current_user),
@@ -776,20 +932,10 @@ async def summarize_document(
         raise HTTPException(status_code=503, detail="LLM is disabled")
 
     excerpt = text.strip()[:12000]
-    prompt = (
-        "You are a legal assistant for Pakistan. "
-        "Explain the document below in simple, plain language for a non-expert. "
-        "Focus on: parties, obligations, payments, deadlines, termination, penalties, and key risks. "
-        "Do not provide legal advice. Use short paragraphs and '-' bullets. "
-        "Format the response with these headings in order (no duplicates): "
-        "Summary:, Key Clauses:, Key Risks:. "
-        "Summary should be 2-4 sentences. "
-        "Key Clauses and Key Risks should be bullet lists. "
-        "Omit empty sections. End with a complete sentence (no truncation).\n\n"
-        f"Document excerpt:\n{excerpt}"
-    )
+    prompt = f"{SUMMARY_INSTRUCTIONS}{excerpt}"
     llm = get_llm_service()
-    summary = await llm.generate(prompt, max_new_tokens=384)
+    async with _admitted(LLM_ADMISSION, "standard", f"user:{current_user.id}"):
+        summary = await _cancel_on_disconnect(http_request, llm.generate(prompt, max_new_tokens=384))
 
     response_language = language
     if language == "ur":
@@ -836,7 +982,6 @@ async def transcribe_audio(
     output_language: str = Form("source"),
     current_user: User = Depends(get_current_user),
 ):
-    _ = current_user
     if not audio.filename:
         raise HTTPException(status_code=400, detail="Audio file is required")
 
@@ -850,7 +995,10 @@ async def transcribe_audio(
 
     try:
         whisper = get_whisper_service()
-        result = await whisper.transcribe(audio_bytes, input_lang)
+        async with _admitted(WHISPER_ADMISSION, "interactive", f"user:{current_user.id}"):
+            result = await whisper.transcribe(audio_bytes, input_lang)
+    except HTTPException:
+        raise
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except RuntimeError as exc:
@@ -922,6 +1070,7 @@ def delete_document_badge(
 @app.post("/documents/generate", response_model=DocumentGenerateResponse)
 async def generate_document(
     request: DocumentGenerateRequest,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -935,12 +1084,9 @@ async def generate_document(
     if request.polish_with_llm and is_llm_enabled():
         try:
             llm = get_llm_service()
-            polish_prompt = (
-                "Improve clarity and consistency of the document below without adding, removing, or reordering clauses. "
-                "Preserve headings and line breaks. Do not add legal advice. Respond ONLY in English.\n\n"
-                f"Document:\n{content}"
-            )
-            polished = await llm.generate(polish_prompt, max_new_tokens=512)
+            polish_prompt = f"{POLISH_INSTRUCTIONS}{content}"
+            async with _admitted(LLM_ADMISSION, "standard", f"user:{current_user.id}"):
+                polished = await _cancel_on_disconnect(http_request, llm.generate(polish_prompt, max_new_tokens=512))
             if polished and polished.strip():
                 content = polished
         except Exception:
@@ -1117,125 +1263,342 @@ def delete_chat(
     return {"status": "deleted"}
 
 
-@app.post("/rag/build")
-def rag_build_index():
+@app.post("/rag/build", status_code=status.HTTP_202_ACCEPTED)
+def rag_build_index(full: bool = False):
     retriever = get_retrieval_service()
     try:
-        return retriever.build_index()
+        job = retriever.start_build(full_rebuild=full)
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return job.to_dict()
+
+
+@app.get("/rag/build/{job_id}")
+def rag_build_status(job_id: str):
+    job = get_retrieval_service().get_build_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Build job not found")
+    return job.to_dict()
+
+
+@app.get("/rag/cache")
+def rag_cache_stats():
+    return get_retrieval_service().cache_stats()
+
+
+@app.get("/rag/batching")
+def rag_batching_stats():
+    return get_retrieval_service().batching_stats()
+
+
+@app.get("/rag/answer-cache")
+def rag_answer_cache_stats():
+    return ANSWER_CACHE.stats()
+
+
+@app.get("/rag/rerank")
+def rag_rerank_stats():
+    return get_retrieval_service().rerank_stats()
 
 
 @app.post("/rag/search")
 def rag_search(request: RagQueryRequest):
     retriever = get_retrieval_service()
     try:
-        matches = retriever.search(request.query, top_k=request.top_k)
+        matches, rerank_report = retriever.search_with_rerank(
+            request.query,
+            top_k=request.top_k,
+            mode=request.search_mode,
+            filters=request.filters.model_dump() if request.filters else None,
+            rerank=request.rerank,
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    return {"query": request.query, "results": matches}
+    return {"query": request.query, "results": matches, "rerank": rerank_report}
+
+
+@dataclass
+class RagAnswerPlan:
+    llm: Any
+    chat: Optional[Chat]
+    prompt: str
+    matches: List[dict]
+    rerank_report: Optional[dict]
+    citation_lookup: bool
+    context_stats: Dict[str, Any]
+    index_version: Optional[int] = None
+    cache_key: Optional[tuple] = None
+    query_embedding: Any = None
+    cached_answer: Optional[str] = None
+    answer_cache: Optional[Dict[str, Any]] = None
+
+
+def _plan_rag_answer(
+    request: RagQueryRequest,
+    db: Session,
+    current_user: Optional[User],
+) -> RagAnswerPlan:
+    if not is_llm_enabled():
+        raise HTTPException(status_code=503, detail="LLM is disabled")
+    chat = None
+    history = request.history
+    if request.chat_id:
+        if current_user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        chat = (
+            db.query(Chat)
+            .filter(Chat.id == request.chat_id, Chat.user_id == current_user.id)
+            .first()
+        )
+        if chat is None:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        history = _load_chat_history(db, request.chat_id)
+
+    retriever = get_retrieval_service()
+    filters = request.filters.model_dump() if request.filters else None
+    candidates = max(request.top_k, CONTEXT_CANDIDATES)
+    rerank_report = None
+    # "Section 27 of the Contract Act" is answered from the section index without embedding the query.
+    matches = retriever.lookup_citations(request.query, top_k=candidates, filters=filters)
+    citation_lookup = matches is not None
+    if matches is None:
+        try:
+            matches, rerank_report = retriever.search_with_rerank(
+                request.query,
+                top_k=candidates,
+                mode=request.search_mode,
+                filters=filters,
+                rerank=request.rerank,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    llm = get_llm_service()
+    # Adjacent chunks of a section are merged and repeated text dropped, then blocks fill the
+    # token budget; the request's top_k hits are always kept, further candidates only if they fit.
+    packed_blocks, context_stats = pack_context(
+        matches,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        count_tokens=llm.count_tokens,
+        required_hits=request.top_k,
+    )
+    packed_hits = {id(hit) for block in packed_blocks for hit in block.hits}
+    matches = [hit for hit in matches if id(hit) in packed_hits]
+
+    context_blocks = []
+    for idx, block in enumerate(packed_blocks, start=1):
+        context_blocks.append(
+            f"[{idx}] {block.text}\nSource: {block.law_name} §{block.section_id} ({', '.join(block.chunk_ids)})"
+        )
+
+    context = "\n\n".join(context_blocks)
+    history_block = _format_history(history)
+    history_prompt = ""
+    if history_block:
+        history_prompt = f"Conversation so far:\n{history_block}\n\n"
+    base_prompt = f"{RAG_INSTRUCTIONS}{history_prompt}Question: {request.query}\n\nContext:\n{context}"
+    plan = RagAnswerPlan(
+        llm=llm,
+        chat=chat,
+        prompt=base_prompt,
+        matches=matches,
+        rerank_report=rerank_report,
+        citation_lookup=citation_lookup,
+        context_stats=context_stats,
+    )
+    if ANSWER_CACHE.enabled:
+        # The generated text depends only on the question, the packed chunks, the history and the length cap.
+        plan.index_version = retriever.index_version
+        plan.cache_key = context_key(
+            [hit.get("chunk_id") for hit in matches],
+            request.language,
+            request.max_new_tokens,
+            history_hash(history_block),
+        )
+        # Citation answers never embed the query; for the rest retrieval already did, so this is a query-cache hit.
+        similar = ANSWER_CACHE.similarity > 0 and not citation_lookup
+
+        def embed():
+            if plan.query_embedding is None:
+                plan.query_embedding = retriever.embed_query(request.query)
+            return plan.query_embedding
+
+        plan.cached_answer, plan.answer_cache = ANSWER_CACHE.get(
+            plan.index_version,
+            plan.cache_key,
+            request.query,
+            embed if similar else None,
+        )
+        if plan.cached_answer is None and similar:
+            # Stored with the answer so later rephrasings can match it.
+            embed()
+    return plan
+
+
+def _store_answer(request: RagQueryRequest, plan: RagAnswerPlan, answer: str) -> None:
+    if plan.cache_key is not None:
+        ANSWER_CACHE.put(plan.index_version, plan.cache_key, request.query, answer, plan.query_embedding)
+
+
+def _finish_rag_answer(
+    request: RagQueryRequest,
+    db: Session,
+    plan: RagAnswerPlan,
+    answer: str,
+) -> Dict[str, Any]:
+    chat = plan.chat
+    matches = plan.matches
+    response_language = request.language
+    if request.language == "ur":
+        answer = translate_to_urdu(answer)
+        if not _contains_urdu(answer):
+            response_language = "en"
+    elif request.language == "en" and _contains_urdu(answer):
+        answer = translate_to_english(answer)
+    needs_referral = _needs_referral(matches, answer, request.query)
+    referral_expert = _select_referral(matches) if needs_referral else None
+    if needs_referral:
+        intro_line = _referral_intro(request.language)
+        if not (answer or "").strip():
+            answer = intro_line
+        else:
+            answer = f"{intro_line}\n\n{answer.strip()}"
+    if chat is not None:
+        persisted_answer = answer
+        if needs_referral and referral_expert:
+            persisted_answer = _embed_referral_payload(answer, referral_expert)
+        user_message = Message(
+            chat_id=chat.id,
+            role="user",
+            content=request.query,
+            language=request.language,
+        )
+        assistant_message = Message(
+            chat_id=chat.id,
+            role="assistant",
+            content=persisted_answer,
+            language=request.language,
+        )
+        if chat.title == "New chat":
+            chat.title = request.query[:60]
+        chat.updated_at = datetime.utcnow()
+        db.add_all([user_message, assistant_message, chat])
+        db.commit()
+    return {
+        "answer": answer,
+        "sources": matches,
+        "language": response_language,
+        "chat_title": chat.title if chat is not None else None,
+        "needs_referral": needs_referral,
+        "referral_expert": referral_expert,
+        "rerank": plan.rerank_report,
+        "citation_lookup": plan.citation_lookup,
+        "context": plan.context_stats,
+        "answer_cache": plan.answer_cache,
+    }
+
+
+def _finish_streamed_answer(request: RagQueryRequest, plan: RagAnswerPlan, answer: str) -> Dict[str, Any]:
+    # The stream outlives the request-scoped session, so the answer is persisted through a session of its own.
+    with SessionLocal() as db:
+        if plan.chat is not None:
+            plan.chat = db.query(Chat).filter(Chat.id == plan.chat.id).first()
+        return _finish_rag_answer(request, db, plan, answer)
+
+
+def _rag_failure_detail(exc: Exception) -> str:
+    detail = f"RAG answer failed: {type(exc).__name__}"
+    if str(exc):
+        detail = f"{detail}: {exc}"
+    return detail
+
+
+def _sse_event(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
 
 
 @app.post("/rag/answer")
 async def rag_answer(
     request: RagQueryRequest,
+    http_request: Request,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional),
 ):
+    user_key = _client_key(current_user, http_request)
     try:
-        if not is_llm_enabled():
-            raise HTTPException(status_code=503, detail="LLM is disabled")
-        chat = None
-        history = request.history
-        if request.chat_id:
-            if current_user is None:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-            chat = (
-                db.query(Chat)
-                .filter(Chat.id == request.chat_id, Chat.user_id == current_user.id)
-                .first()
-            )
-            if chat is None:
-                raise HTTPException(status_code=404, detail="Chat not found")
-            history = _load_chat_history(db, request.chat_id)
-
-        retriever = get_retrieval_service()
-        try:
-            matches = retriever.search(request.query, top_k=request.top_k)
-        except ValueError as exc:
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-        context_blocks = []
-        for idx, item in enumerate(matches, start=1):
-            context_blocks.append(
-                f"[{idx}] {item.get('text')}\nSource: {item.get('law_name')} §{item.get('section_id')} ({item.get('chunk_id')})"
-            )
+        # Retrieval blocks (query embedding micro-batches, rerank); off the loop, concurrent queries can share a batch.
+        plan = await run_in_threadpool(_plan_rag_answer, request, db, current_user)
+        answer = plan.cached_answer
+        # Cached answers skip admission entirely; only a miss needs an LLM slot.
+        if answer is None:
+            async with _admitted(LLM_ADMISSION, "interactive", user_key):
+                answer = await _cancel_on_disconnect(
+                    http_request,
+                    plan.llm.generate(plan.prompt, max_new_tokens=request.max_new_tokens),
+                )
+            _store_answer(request, plan, answer)
+        # Translation makes blocking HTTP calls.
+        return await run_in_threadpool(_finish_rag_answer, request, db, plan, answer)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.exception("RAG answer failed")
+        raise HTTPException(status_code=500, detail=_rag_failure_detail(exc)) from exc
 
-        context = "\n\n".join(context_blocks)
-        history_block = _format_history(history)
-        history_prompt = ""
-        if history_block:
-            history_prompt = f"Conversation so far:\n{history_block}\n\n"
-        base_prompt = (
-            "Answer the question using ONLY the context below. "
-            "If the context does not contain the answer, say you don't have enough information. "
-            "Do not provide legal advice. "
-            "Respond ONLY in English. Do not use Urdu.\n\n"
-            f"{history_prompt}Question: {request.query}\n\nContext:\n{context}"
-        )
 
-        llm = get_llm_service()
-        answer = await llm.generate(base_prompt, max_new_tokens=request.max_new_tokens)
-
-        response_language = request.language
-        if request.language == "ur":
-            answer = translate_to_urdu(answer)
-            if not _contains_urdu(answer):
-                response_language = "en"
-        elif request.language == "en" and _contains_urdu(answer):
-            answer = translate_to_english(answer)
-        needs_referral = _needs_referral(matches, answer, request.query)
-        referral_expert = _select_referral(matches) if needs_referral else None
-        if needs_referral:
-            intro_line = _referral_intro(request.language)
-            if not (answer or "").strip():
-                answer = intro_line
-            else:
-                answer = f"{intro_line}\n\n{answer.strip()}"
-        if chat is not None:
-            persisted_answer = answer
-            if needs_referral and referral_expert:
-                persisted_answer = _embed_referral_payload(answer, referral_expert)
-            user_message = Message(
-                chat_id=chat.id,
-                role="user",
-                content=request.query,
-                language=request.language,
-            )
-            assistant_message = Message(
-                chat_id=chat.id,
-                role="assistant",
-                content=persisted_answer,
-                language=request.language,
-            )
-            if chat.title == "New chat":
-                chat.title = request.query[:60]
-            chat.updated_at = datetime.utcnow()
-            db.add_all([user_message, assistant_message, chat])
-            db.commit()
-        return {
-            "answer": answer,
-            "sources": matches,
-            "language": response_language,
-            "chat_title": chat.title if chat is not None else None,
-            "needs_referral": needs_referral,
-            "referral_expert": referral_expert,
-        }
+@app.post("/rag/answer/stream")
+async def rag_answer_stream(
+    request: RagQueryRequest,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    user_key = _client_key(current_user, http_request)
+    # Validation, admission and retrieval failures still come back as plain HTTP errors, before the stream opens.
+    try:
+        plan = await run_in_threadpool(_plan_rag_answer, request, db, current_user)
+        if plan.cached_answer is None:
+            _check_admission(LLM_ADMISSION, "interactive", user_key)
     except HTTPException:
         raise
     except Exception as exc:
         logger.exception("RAG answer failed")
-        detail = f"RAG answer failed: {type(exc).__name__}"
-        if str(exc):
-            detail = f"{detail}: {exc}"
-        raise HTTPException(status_code=500, detail=detail) from exc
+        raise HTTPException(status_code=500, detail=_rag_failure_detail(exc)) from exc
+
+    async def events():
+        yield _sse_event(
+            "sources",
+            {
+                "sources": plan.matches,
+                "rerank": plan.rerank_report,
+                "citation_lookup": plan.citation_lookup,
+                "context": plan.context_stats,
+            },
+        )
+        try:
+            answer = plan.cached_answer
+            if answer is not None:
+                yield _sse_event("token", {"text": answer})
+            else:
+                parts: List[str] = []
+                async with LLM_ADMISSION.slot("interactive", user_key):
+                    async for chunk in plan.llm.stream(plan.prompt, max_new_tokens=request.max_new_tokens):
+                        parts.append(chunk)
+                        yield _sse_event("token", {"text": chunk})
+                answer = "".join(parts).strip()
+                _store_answer(request, plan, answer)
+            # Tokens are the English draft; "done" carries the final answer after translation and referral.
+            yield _sse_event("done", await run_in_threadpool(_finish_streamed_answer, request, plan, answer))
+        except AdmissionRejected as exc:
+            yield _sse_event("error", {"detail": exc.detail, "status": exc.status_code})
+        except Exception as exc:
+            logger.exception("RAG answer stream failed")
+            yield _sse_event("error", {"detail": _rag_failure_detail(exc)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,102 @@
+import argparse
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from backend.ingestion.postprocess_dataset import (
+    Section,
+    chunk_section_text,
+    estimate_tokens,
+    extract_sections,
+    load_word_token_counter,
+    normalize_text,
+    remove_toc_blocks,
+)
+
+
+def quadratic_chunk_section_text(text: str, min_tokens: int, max_tokens: int) -> List[str]:
+    # The previous implementation, kept here as the baseline: it re-joins the chunk after every word.
+    words = text.split()
+    if not words:
+        return []
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for word in words:
+        current.append(word)
+        if estimate_tokens(" ".join(current)) >= max_tokens:
+            chunks.append(" ".join(current).strip())
+            current = []
+
+    if current:
+        if chunks and estimate_tokens(" ".join(current)) < min_tokens:
+            chunks[-1] = (chunks[-1] + " " + " ".join(current)).strip()
+        else:
+            chunks.append(" ".join(current).strip())
+    return chunks
+
+
+def load_sections(statute: Path) -> List[Section]:
+    text = normalize_text(statute.read_text(encoding="utf-8", errors="ignore"))
+    return extract_sections(remove_toc_blocks(text))
+
+
+def time_chunker(
+    sections: List[Section], chunker: Callable[[str], List[str]], repeats: int
+) -> Tuple[float, List[str]]:
+    best = float("inf")
+    chunks: List[str] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        chunks = [chunk for section in sections for chunk in chunker(section.text)]
+        best = min(best, time.perf_counter() - started)
+    return best, chunks
+
+
+def run(input_dir: Path, min_tokens: int, max_tokens: int, repeats: int, tokenizer_id: Optional[str]) -> None:
+    statutes = sorted(input_dir.glob("*.txt"), key=lambda path: path.stat().st_size, reverse=True)
+    if not statutes:
+        raise FileNotFoundError(f"No .txt files found in {input_dir}")
+    statute = statutes[0]
+    sections = load_sections(statute)
+    longest = max((len(section.text.split()) for section in sections), default=0)
+    print(f"{statute.name}: {len(sections)} sections, longest {longest} words")
+
+    print(f"{'chunker':<12}  {'seconds':>8}  {'chunks':>7}  {'speedup':>7}")
+    baseline_seconds, baseline_chunks = time_chunker(
+        sections, lambda text: quadratic_chunk_section_text(text, min_tokens, max_tokens), repeats
+    )
+    print(f"{'quadratic':<12}  {baseline_seconds:>8.3f}  {len(baseline_chunks):>7}  {1.0:>7.1f}")
+
+    seconds, chunks = time_chunker(
+        sections, lambda text: chunk_section_text(text, min_tokens, max_tokens), repeats
+    )
+    if chunks != baseline_chunks:
+        raise AssertionError("Linear chunker output differs from the quadratic baseline")
+    print(f"{'linear':<12}  {seconds:>8.3f}  {len(chunks):>7}  {baseline_seconds / max(seconds, 1e-9):>7.1f}")
+
+    if tokenizer_id:
+        word_tokens = load_word_token_counter(tokenizer_id)
+        seconds, chunks = time_chunker(
+            sections, lambda text: chunk_section_text(text, min_tokens, max_tokens, word_tokens), repeats
+        )
+        print(f"{'tokenizer':<12}  {seconds:>8.3f}  {len(chunks):>7}  {baseline_seconds / max(seconds, 1e-9):>7.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark section chunking on the largest statute.")
+    parser.add_argument("--input-dir", type=Path, required=True, help="Folder containing the statute .txt files")
+    parser.add_argument("--min-tokens", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tokenizer", default=None, help="Also time chunking with this Hugging Face tokenizer")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    run(args.input_dir, args.min_tokens, args.max_tokens, args.repeats, args.tokenizer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from backend.services.context_packer import estimate_tokens, pack_context
+from backend.services.retrieval_service import get_retrieval_service
+
+SAMPLE_QUERIES = [
+    "What is the penalty for late filing of an income tax return?",
+    "Can an employer terminate a worker without notice?",
+    "When is a contract voidable at the option of a party?",
+    "What are the duties of a company director?",
+    "How is a trade union registered?",
+    "Is a minor competent to contract?",
+    "What is the limitation period for recovering wages?",
+    "Who can call an extraordinary general meeting?",
+]
+
+
+def verbatim_context(matches: List[Dict]) -> str:
+    return "\n\n".join(
+        f"[{idx}] {item.get('text')}\nSource: {item.get('law_name')} §{item.get('section_id')} ({item.get('chunk_id')})"
+        for idx, item in enumerate(matches, start=1)
+    )
+
+
+def packed_context(matches: List[Dict], budget: int, count_tokens: Callable[[str], int], top_k: int) -> str:
+    blocks, _ = pack_context(matches, token_budget=budget, count_tokens=count_tokens, required_hits=top_k)
+    return "\n\n".join(
+        f"[{idx}] {block.text}\nSource: {block.law_name} §{block.section_id} ({', '.join(block.chunk_ids)})"
+        for idx, block in enumerate(blocks, start=1)
+    )
+
+
+def run(queries: List[str], top_k: int, candidates: int, budget: int, use_llm: bool) -> None:
+    retriever = get_retrieval_service()
+    llm = None
+    count_tokens = estimate_tokens
+    if use_llm:
+        from backend.services.llm_service import get_llm_service
+
+        llm = get_llm_service()
+        count_tokens = llm.count_tokens
+
+    rows: Dict[str, Dict[str, List[float]]] = {
+        name: {"tokens": [], "prefill": []} for name in ("verbatim", "packed")
+    }
+    for query in queries:
+        matches = retriever.search(query, top_k=max(top_k, candidates))
+        contexts = {
+            "verbatim": verbatim_context(matches[:top_k]),
+            "packed": packed_context(matches, budget, count_tokens, top_k),
+        }
+        for name, context in contexts.items():
+            rows[name]["tokens"].append(count_tokens(context))
+            if llm is not None:
+                # One new token is dominated by prefill, so this times prompt processing.
+                started = time.perf_counter()
+                llm.generate_sync(f"Question: {query}\n\nContext:\n{context}", max_new_tokens=1)
+                rows[name]["prefill"].append(time.perf_counter() - started)
+
+    print(f"{'context':<9}  {'mean tokens':>11}  {'p50 prefill s':>13}")
+    for name, values in rows.items():
+        prefill: Optional[float] = float(np.percentile(values["prefill"], 50)) if values["prefill"] else None
+        prefill_text = f"{prefill:>13.3f}" if prefill is not None else f"{'-':>13}"
+        print(f"{name:<9}  {np.mean(values['tokens']):>11.1f}  {prefill_text}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare verbatim top-k context with packed context.")
+    parser.add_argument("--queries-file", type=Path, default=None, help="One query per line")
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--candidates", type=int, default=6)
+    parser.add_argument("--budget", type=int, default=700)
+    parser.add_argument("--llm", action="store_true", help="Also time LLM prefill for both contexts")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    queries = SAMPLE_QUERIES
+    if args.queries_file is not None:
+        queries = [line.strip() for line in args.queries_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+    run(queries, args.top_k, args.candidates, args.budget, args.llm)
+
+
+if __name__ == "__main__":
+    main()
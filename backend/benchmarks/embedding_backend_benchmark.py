@@ -0,0 +1,116 @@
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SAMPLE_QUERIES = [
+    "What is the penalty for late filing of an income tax return?",
+    "Can an employer terminate a worker without notice?",
+    "When is a contract voidable at the option of a party?",
+    "What are the duties of a company director?",
+    "How is a trade union registered?",
+    "Is a minor competent to contract?",
+    "What is the limitation period for recovering wages?",
+    "Who can call an extraordinary general meeting?",
+]
+
+
+def measure(
+    model_id: str,
+    backend: str,
+    quantization: str,
+    export_dir: Optional[Path],
+    repeats: int,
+    out: Path,
+) -> Dict[str, Any]:
+    import psutil
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    started = time.perf_counter()
+    from backend.services.embedding_backends import load_embedding_model
+
+    model = load_embedding_model(model_id, backend, quantization, export_dir)
+    model.encode(["query: warm up"], normalize_embeddings=True)
+    load_seconds = time.perf_counter() - started
+
+    latencies: List[float] = []
+    for _ in range(repeats):
+        for query in SAMPLE_QUERIES:
+            began = time.perf_counter()
+            model.encode([f"query: {query}"], normalize_embeddings=True)
+            latencies.append((time.perf_counter() - began) * 1000.0)
+    vectors = model.encode([f"query: {query}" for query in SAMPLE_QUERIES], normalize_embeddings=True)
+    np.save(out, np.asarray(vectors, dtype=np.float32))
+    return {
+        "load_seconds": load_seconds,
+        "rss_mb": (process.memory_info().rss - rss_before) / (1024 * 1024),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run(model_id: str, quantization: str, export_root: Path, repeats: int) -> None:
+    from backend.services.embedding_backends import compare_embeddings
+
+    configs = [("torch", "none"), ("onnx", "none")]
+    if quantization != "none":
+        configs.append(("onnx", quantization))
+    print(f"{'backend':<18}  {'load s':>7}  {'rss MB':>7}  {'p50 ms':>7}  {'p99 ms':>7}  {'min cos':>8}")
+    reference: Optional[np.ndarray] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend, quant in configs:
+            out = Path(tmp) / f"{backend}_{quant}.npy"
+            # Each backend runs in a fresh interpreter so start-up time and RSS are not shared.
+            command = [
+                sys.executable, "-m", "backend.benchmarks.embedding_backend_benchmark",
+                "--model", model_id, "--worker", backend, "--quantization", quant,
+                "--export-dir", str(export_root), "--repeats", str(repeats), "--out", str(out),
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(f"{backend} ({quant}) benchmark failed:\n{completed.stderr}")
+            stats = json.loads(completed.stdout.strip().splitlines()[-1])
+            vectors = np.load(out)
+            if reference is None:
+                reference = vectors
+            min_cosine = compare_embeddings(reference, vectors)["min_cosine"]
+            label = backend if quant == "none" else f"{backend}-{quant}"
+            print(
+                f"{label:<18}  {stats['load_seconds']:>7.2f}  {stats['rss_mb']:>7.0f}  "
+                f"{stats['p50_ms']:>7.2f}  {stats['p99_ms']:>7.2f}  {min_cosine:>8.5f}"
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare torch and ONNX Runtime embedding backends on CPU.")
+    parser.add_argument("--model", default="intfloat/multilingual-e5-small")
+    parser.add_argument("--quantization", default="avx2", help="ONNX int8 variant to include, or 'none'")
+    parser.add_argument(
+        "--export-dir",
+        type=Path,
+        default=Path(__file__).resolve().parents[1] / "data" / "onnx" / "benchmark",
+    )
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--out", type=Path, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.worker:
+        export_dir = args.export_dir / args.model.replace("/", "__") if args.worker == "onnx" else None
+        print(json.dumps(measure(args.model, args.worker, args.quantization, export_dir, args.repeats, args.out)))
+        return
+    run(args.model, args.quantization, args.export_dir, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
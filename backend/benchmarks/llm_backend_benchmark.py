@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+SAMPLE_PROMPTS = [
+    "Explain in three sentences when a contract is void for lack of consideration.",
+    "What notice must an employer give before terminating a permanent worker?",
+    "Summarise the duties of a company director under Pakistani law.",
+    "Is an agreement made by a minor enforceable? Answer briefly.",
+]
+
+CONFIGS: List[Tuple[str, str]] = [("transformers", "none"), ("transformers", "int8"), ("llama_cpp", "gguf")]
+
+
+async def time_stream(llm: Any, prompt: str, max_new_tokens: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    first_token_at = 0.0
+    pieces: List[str] = []
+    async for text in llm.stream(prompt, max_new_tokens):
+        if not pieces:
+            first_token_at = time.perf_counter()
+        pieces.append(text)
+    finished = time.perf_counter()
+    tokens = llm.count_tokens("".join(pieces))
+    return {
+        "ttft_ms": (first_token_at - started) * 1000.0,
+        "tokens": tokens,
+        # The first token pays for prefill, so decode speed is measured over the remaining ones.
+        "decode_tokens_per_s": max(tokens - 1, 0) / max(finished - first_token_at, 1e-9),
+        "tokens_per_s": tokens / max(finished - started, 1e-9),
+    }
+
+
+def measure(backend: str, repeats: int, max_new_tokens: int) -> Dict[str, Any]:
+    import psutil
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    started = time.perf_counter()
+    from backend.services.llm_service import create_llm_service
+
+    llm = create_llm_service(backend)
+    load_seconds = time.perf_counter() - started
+    asyncio.run(time_stream(llm, "Say hello.", 4))
+
+    samples: List[Dict[str, float]] = []
+    for _ in range(repeats):
+        for prompt in SAMPLE_PROMPTS:
+            samples.append(asyncio.run(time_stream(llm, prompt, max_new_tokens)))
+    return {
+        "load_seconds": load_seconds,
+        "rss_mb": (process.memory_info().rss - rss_before) / (1024 * 1024),
+        "p50_ttft_ms": float(np.percentile([sample["ttft_ms"] for sample in samples], 50)),
+        "decode_tokens_per_s": float(np.mean([sample["decode_tokens_per_s"] for sample in samples])),
+        "tokens_per_s": float(np.mean([sample["tokens_per_s"] for sample in samples])),
+        "mean_tokens": float(np.mean([sample["tokens"] for sample in samples])),
+    }
+
+
+def run(configs: List[Tuple[str, str]], repeats: int, max_new_tokens: int) -> None:
+    print(
+        f"{'backend':<20}  {'load s':>7}  {'rss MB':>7}  {'ttft ms':>8}  {'decode tok/s':>12}  "
+        f"{'e2e tok/s':>9}  {'tokens':>6}"
+    )
+    for backend, variant in configs:
+        env = dict(os.environ, LLM_BATCH_SIZE="1")
+        if backend == "transformers":
+            env["LLM_QUANTIZATION"] = variant
+        # Each backend runs in a fresh interpreter so load time, RSS and thread pools are not shared.
+        command = [
+            sys.executable, "-m", "backend.benchmarks.llm_backend_benchmark",
+            "--worker", backend, "--repeats", str(repeats), "--max-new-tokens", str(max_new_tokens),
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True, env=env)
+        label = f"{backend}-{variant}"
+        if completed.returncode != 0:
+            print(f"{label:<20}  failed: {completed.stderr.strip().splitlines()[-1] if completed.stderr else '?'}")
+            continue
+        stats = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(
+            f"{label:<20}  {stats['load_seconds']:>7.2f}  {stats['rss_mb']:>7.0f}  {stats['p50_ttft_ms']:>8.1f}  "
+            f"{stats['decode_tokens_per_s']:>12.2f}  {stats['tokens_per_s']:>9.2f}  {stats['mean_tokens']:>6.0f}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare tokens/s of the transformers, int8 and llama.cpp LLM backends.")
+    parser.add_argument(
+        "--configs",
+        nargs="+",
+        default=[f"{backend}-{variant}" for backend, variant in CONFIGS],
+        help="Subset of: " + ", ".join(f"{backend}-{variant}" for backend, variant in CONFIGS),
+    )
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.repeats, args.max_new_tokens)))
+        return
+    configs = [(backend, variant) for backend, variant in CONFIGS if f"{backend}-{variant}" in args.configs]
+    run(configs, args.repeats, args.max_new_tokens)
+
+
+if __name__ == "__main__":
+    main()
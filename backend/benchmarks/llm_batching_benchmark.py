@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.services.generation_scheduler import GenerationScheduler
+from backend.services.llm_service import LLMService
+
+SAMPLE_QUERIES = [
+    "What is the penalty for late filing of an income tax return?",
+    "Can an employer terminate a worker without notice?",
+    "When is a contract voidable at the option of a party?",
+    "What are the duties of a company director?",
+    "How is a trade union registered?",
+    "Is a minor competent to contract?",
+    "What is the limitation period for recovering wages?",
+    "Who can call an extraordinary general meeting?",
+]
+
+
+class TokenClock:
+    # Minimal streamer: generate() and the scheduler both push the prompt first, then each new token.
+    def __init__(self) -> None:
+        self.prompt_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.tokens = 0
+
+    def put(self, value: Any) -> None:
+        now = time.perf_counter()
+        if self.prompt_at is None:
+            self.prompt_at = now
+            return
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.tokens += int(value.numel())
+
+    def end(self) -> None:
+        self.finished_at = time.perf_counter()
+
+
+async def one_user(llm: LLMService, user: int, requests: int, max_new_tokens: int) -> List[Dict[str, float]]:
+    rows = []
+    for turn in range(requests):
+        query = SAMPLE_QUERIES[(user + turn) % len(SAMPLE_QUERIES)]
+        prompt = f"Answer briefly. Do not provide legal advice.\n\nQuestion: {query}"
+        clock = TokenClock()
+        started = time.perf_counter()
+        await llm.generate(prompt, max_new_tokens=max_new_tokens, streamer=clock)
+        finished = time.perf_counter()
+        prompt_at = clock.prompt_at or started
+        first_token_at = clock.first_token_at or finished
+        rows.append(
+            {
+                "queue_ms": (prompt_at - started) * 1000.0,
+                "ttft_ms": (first_token_at - started) * 1000.0,
+                "latency_ms": (finished - started) * 1000.0,
+                "tokens": clock.tokens,
+                "tokens_per_s": clock.tokens / max(finished - prompt_at, 1e-9),
+            }
+        )
+    return rows
+
+
+async def run_load(llm: LLMService, users: int, requests: int, max_new_tokens: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_user(llm, user, requests, max_new_tokens) for user in range(users)))
+    wall = time.perf_counter() - started
+    rows = [row for user_rows in results for row in user_rows]
+    return {
+        "throughput": sum(row["tokens"] for row in rows) / wall,
+        "queue_ms": float(np.percentile([row["queue_ms"] for row in rows], 50)),
+        "ttft_ms": float(np.percentile([row["ttft_ms"] for row in rows], 50)),
+        "p95_latency_ms": float(np.percentile([row["latency_ms"] for row in rows], 95)),
+        "tokens_per_s": float(np.percentile([row["tokens_per_s"] for row in rows], 50)),
+    }
+
+
+def run(user_counts: List[int], requests: int, max_new_tokens: int, batch_size: int) -> None:
+    llm = LLMService()
+    modes = {
+        "pool": None,
+        f"batch-{batch_size}": GenerationScheduler(llm.model, llm.tokenizer, llm._torch, max_batch_size=batch_size),
+    }
+    print(
+        f"{'mode':<10}  {'users':>5}  {'tok/s total':>11}  {'p50 queue ms':>12}  "
+        f"{'p50 ttft ms':>11}  {'p95 latency ms':>14}  {'p50 tok/s/req':>13}"
+    )
+    for users in user_counts:
+        for name, scheduler in modes.items():
+            llm.scheduler = scheduler
+            row = asyncio.run(run_load(llm, users, requests, max_new_tokens))
+            print(
+                f"{name:<10}  {users:>5}  {row['throughput']:>11.1f}  {row['queue_ms']:>12.1f}  "
+                f"{row['ttft_ms']:>11.1f}  {row['p95_latency_ms']:>14.1f}  {row['tokens_per_s']:>13.2f}"
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the LLM thread pool with the continuous batching scheduler.")
+    parser.add_argument("--users", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--requests", type=int, default=2, help="Requests per simulated user")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    run(args.users, args.requests, args.max_new_tokens, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from backend.app.main import POLISH_INSTRUCTIONS, RAG_INSTRUCTIONS, SUMMARY_INSTRUCTIONS
+from backend.services.llm_service import LLMService
+from backend.services.risk_engine import RISK_INSTRUCTIONS
+
+SAMPLE_DOCUMENT = (
+    "This Agreement is made between the Employer and the Employee. The Employee shall serve for a period of "
+    "two years. Either party may terminate this Agreement by giving one month's written notice. The Employee "
+    "shall not disclose confidential information during or after employment. Salary shall be paid on the last "
+    "working day of each month."
+)
+SAMPLE_CONTEXT = (
+    "[1] An agreement not to do a certain thing is void unless made for a lawful consideration.\n"
+    "Source: Contract Act, 1872 §25 (contract_act::s25::chunk-0)"
+)
+
+
+def endpoint_prompts() -> Dict[str, str]:
+    return {
+        "rag_answer": (
+            f"{RAG_INSTRUCTIONS}Question: Is an agreement without consideration void?\n\nContext:\n{SAMPLE_CONTEXT}"
+        ),
+        "document_summary": f"{SUMMARY_INSTRUCTIONS}{SAMPLE_DOCUMENT}",
+        "document_review": f"{RISK_INSTRUCTIONS}{SAMPLE_DOCUMENT}",
+        "document_polish": f"{POLISH_INSTRUCTIONS}{SAMPLE_DOCUMENT}",
+    }
+
+
+def time_prefill(llm: LLMService, prompt: str, repeats: int) -> float:
+    samples: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        # One new token is dominated by prefill, so this times prompt processing.
+        llm.generate_sync(prompt, max_new_tokens=1)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return float(np.percentile(samples, 50))
+
+
+def run(repeats: int) -> None:
+    llm = LLMService()
+    llm.scheduler = None
+    prefix_cache = llm.prefix_cache
+    if prefix_cache is None:
+        raise RuntimeError("Set LLM_PREFIX_CACHE=1 to benchmark prefix caching.")
+    print(f"{'endpoint':<18}  {'prompt tok':>10}  {'reused tok':>10}  {'cold ms':>8}  {'cached ms':>9}  {'saved':>6}")
+    for name, prompt in endpoint_prompts().items():
+        input_ids, _ = llm._chat_inputs(prompt)
+        _, reused = prefix_cache.match(input_ids)
+        llm.prefix_cache = None
+        cold = time_prefill(llm, prompt, repeats)
+        llm.prefix_cache = prefix_cache
+        cached = time_prefill(llm, prompt, repeats)
+        print(
+            f"{name:<18}  {input_ids.shape[-1]:>10}  {reused:>10}  {cold:>8.1f}  {cached:>9.1f}  "
+            f"{(1.0 - cached / cold) * 100.0:>5.1f}%"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure prefill time with and without the prompt prefix KV cache.")
+    parser.add_argument("--repeats", type=int, default=5)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    run(args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from backend.services.ann_index import IVFIndex, exact_search, measure_recall
+
+
+def synthetic_embeddings(count: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    embeddings = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, 100000):
+        block = labels[start:start + 100000]
+        noise = rng.standard_normal((len(block), dim)).astype(np.float32) * 0.6
+        embeddings[start:start + len(block)] = centers[block] + noise
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+def time_queries(search_fn: Callable, queries: np.ndarray, top_k: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    for query in queries:
+        started = time.perf_counter()
+        search_fn(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run(sizes: List[int], dim: int, queries: int, top_k: int, n_probe: int) -> None:
+    print(f"{'chunks':>9}  {'mode':<5}  {'p50 ms':>8}  {'p99 ms':>8}  {'recall@k':>8}  {'build s':>7}")
+    for size in sizes:
+        embeddings = synthetic_embeddings(size, dim, clusters=max(16, size // 500))
+        rng = np.random.default_rng(1)
+        probe_ids = rng.choice(size, size=min(queries, size), replace=False)
+        noise = rng.standard_normal((len(probe_ids), dim)).astype(np.float32) * 0.05
+        probe_queries = embeddings[probe_ids] + noise
+        probe_queries /= np.linalg.norm(probe_queries, axis=1, keepdims=True)
+
+        def exact_fn(query, k):
+            return exact_search(embeddings, query, k)
+
+        stats = time_queries(exact_fn, probe_queries, top_k)
+        print(f"{size:>9}  {'exact':<5}  {stats['p50_ms']:>8.2f}  {stats['p99_ms']:>8.2f}  {1.0:>8.3f}  {'-':>7}")
+
+        started = time.perf_counter()
+        index = IVFIndex.build(embeddings)
+        build_seconds = time.perf_counter() - started
+
+        def ivf_fn(query, k):
+            return index.search(embeddings, query, k, n_probe=n_probe)
+
+        stats = time_queries(ivf_fn, probe_queries, top_k)
+        recall = measure_recall(embeddings, ivf_fn, top_k=top_k, sample_size=min(queries, 100))
+        print(
+            f"{size:>9}  {'ivf':<5}  {stats['p50_ms']:>8.2f}  {stats['p99_ms']:>8.2f}  "
+            f"{recall:>8.3f}  {build_seconds:>7.1f}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark exact vs IVF retrieval latency on synthetic embeddings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding width (multilingual-e5-small is 384)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    run(args.sizes, args.dim, args.queries, args.top_k, args.nprobe)
+
+
+if __name__ == "__main__":
+    main()
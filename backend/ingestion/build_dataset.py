@@ -1,9 +1,23 @@
 import argparse
-import json
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from backend.utils.jsonl import JsonlWriter
+from backend.utils.manifest import (
+	IngestionManifest,
+	PreviousOutput,
+	diff_documents,
+	document_entry,
+	file_sha256,
+	manifest_path,
+	reuse_records,
+)
+from backend.utils.parallel import ordered_map
 
 
 ALLOWED_STATUTES = {
@@ -42,6 +56,14 @@ class Section:
 	text: str
 
 
+@dataclass
+class FileTiming:
+	file_name: str
+	records: int
+	seconds: float
+	reused: bool = False
+
+
 def detect_language(text: str) -> str:
 	has_urdu = any("\u0600" <= ch <= "\u06FF" for ch in text)
 	has_latin = any("A" <= ch <= "z" for ch in text)
@@ -118,43 +140,102 @@ def map_law_metadata(file_path: Path) -> Tuple[str, str]:
 	)
 
 
-def build_dataset(input_dir: Path, output_path: Path, chunk_size: int, overlap: int) -> None:
-	records = []
+def iter_file_records(txt_file: Path, chunk_size: int, overlap: int) -> Iterator[Dict]:
+	law_name, domain = map_law_metadata(txt_file)
+	raw_text = txt_file.read_text(encoding="utf-8", errors="ignore")
+	normalized = normalize_text(raw_text)
+	language = detect_language(normalized)
+	sections = extract_sections(normalized)
+
+	for section in sections:
+		for chunk_index, (start, end, chunk) in enumerate(
+			chunk_text(section.text, chunk_size=chunk_size, overlap=overlap)
+		):
+			yield {
+				"doc_id": txt_file.stem,
+				"law_name": law_name,
+				"domain": domain,
+				"jurisdiction": "Pakistan",
+				"source": "Statute",
+				"language": language,
+				"section_id": section.section_id,
+				"section_title": section.title,
+				"chunk_id": f"{txt_file.stem}::sec-{section.section_id}::chunk-{chunk_index}",
+				"chunk_index": chunk_index,
+				"chunk_char_start": start,
+				"chunk_char_end": end,
+				"text": chunk,
+			}
+
+
+def _process_file(txt_file: Path, chunk_size: int, overlap: int) -> Tuple[List[Dict], float]:
+	started = time.perf_counter()
+	records = list(iter_file_records(txt_file, chunk_size, overlap))
+	return records, time.perf_counter() - started
+
+
+def _iter_file_results(
+	txt_files: List[Path], chunk_size: int, overlap: int, workers: int
+) -> Iterator[Tuple[Path, List[Dict], float]]:
+	if workers <= 1 or len(txt_files) <= 1:
+		for txt_file in txt_files:
+			records, seconds = _process_file(txt_file, chunk_size, overlap)
+			yield txt_file, records, seconds
+		return
+	workers = min(workers, len(txt_files))
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		# Results come back in submission order, so the output is identical to a serial run.
+		results = ordered_map(pool, _process_file, txt_files, chunk_size, overlap, window=2 * workers)
+		for txt_file, (records, seconds) in zip(txt_files, results):
+			yield txt_file, records, seconds
+
+
+def build_dataset(
+	input_dir: Path,
+	output_path: Path,
+	chunk_size: int,
+	overlap: int,
+	workers: int = 1,
+	force: bool = False,
+) -> Tuple[int, List[FileTiming]]:
 	txt_files = sorted(input_dir.glob("*.txt"))
 	if not txt_files:
 		raise FileNotFoundError(f"No .txt files found in {input_dir}")
-
 	for txt_file in txt_files:
-		law_name, domain = map_law_metadata(txt_file)
-		raw_text = txt_file.read_text(encoding="utf-8", errors="ignore")
-		normalized = normalize_text(raw_text)
-		language = detect_language(normalized)
-		sections = extract_sections(normalized)
-
-		for section in sections:
-			for chunk_index, (start, end, chunk) in enumerate(
-				chunk_text(section.text, chunk_size=chunk_size, overlap=overlap)
-			):
-				records.append(
-					{
-						"doc_id": txt_file.stem,
-						"law_name": law_name,
-						"domain": domain,
-						"jurisdiction": "Pakistan",
-						"source": "Statute",
-						"language": language,
-						"section_id": section.section_id,
-						"section_title": section.title,
-						"chunk_id": f"{txt_file.stem}::sec-{section.section_id}::chunk-{chunk_index}",
-						"chunk_index": chunk_index,
-						"chunk_char_start": start,
-						"chunk_char_end": end,
-						"text": chunk,
-					}
-				)
-
-	output_path.parent.mkdir(parents=True, exist_ok=True)
-	output_path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+		map_law_metadata(txt_file)
+
+	params = {"chunk_size": chunk_size, "overlap": overlap}
+	previous = None if force else IngestionManifest.load_reusable(output_path, params)
+	input_hashes = {txt_file: file_sha256(txt_file) for txt_file in txt_files}
+	stale = [
+		txt_file
+		for txt_file in txt_files
+		if previous is None or not previous.is_current(txt_file.stem, input_hashes[txt_file])
+	]
+
+	timings: List[FileTiming] = []
+	documents: Dict[str, Dict] = {}
+	fresh = _iter_file_results(stale, chunk_size, overlap, workers)
+	with JsonlWriter(output_path) as writer, PreviousOutput(output_path if previous else None) as cursor:
+		for txt_file in txt_files:
+			if txt_file in stale:
+				_, records, seconds = next(fresh)
+				reused = False
+			else:
+				started = time.perf_counter()
+				records = reuse_records(previous, cursor, txt_file.stem, input_hashes[txt_file])
+				reused = records is not None
+				if records is None:
+					records, _ = _process_file(txt_file, chunk_size, overlap)
+				seconds = time.perf_counter() - started
+			for record in records:
+				writer.write(record)
+			documents[txt_file.stem] = document_entry(input_hashes[txt_file], records)
+			timings.append(FileTiming(txt_file.name, len(records), seconds, reused))
+
+	changed, removed = diff_documents(IngestionManifest.load(manifest_path(output_path)), documents)
+	IngestionManifest(params, documents, changed, removed).save(output_path)
+	return writer.count, timings
 
 
 def parse_args() -> argparse.Namespace:
@@ -168,17 +249,31 @@ def parse_args() -> argparse.Namespace:
 	parser.add_argument(
 		"--output",
 		type=Path,
-		default=Path(__file__).resolve().parents[1] / "data" / "legalease_rag_dataset.json",
-		help="Output JSON file path",
+		default=Path(__file__).resolve().parents[1] / "data" / "legalease_rag_dataset.jsonl",
+		help="Output JSONL file path (one record per line)",
 	)
 	parser.add_argument("--chunk-size", type=int, default=1200)
 	parser.add_argument("--overlap", type=int, default=200)
+	parser.add_argument(
+		"--workers",
+		type=int,
+		default=1,
+		help=f"Processes used to parse statutes in parallel (this machine has {os.cpu_count() or 1} CPUs)",
+	)
+	parser.add_argument("--force", action="store_true", help="Reprocess every statute even if it is unchanged")
 	return parser.parse_args()
 
 
 def main() -> None:
 	args = parse_args()
-	build_dataset(args.input_dir, args.output, args.chunk_size, args.overlap)
+	started = time.perf_counter()
+	count, timings = build_dataset(
+		args.input_dir, args.output, args.chunk_size, args.overlap, args.workers, args.force
+	)
+	for timing in sorted(timings, key=lambda item: item.seconds, reverse=True):
+		status = "reused" if timing.reused else "parsed"
+		print(f"{timing.seconds:>8.2f}s  {timing.records:>7} records  {status}  {timing.file_name}")
+	print(f"{time.perf_counter() - started:>8.2f}s  {count:>7} records  total ({args.workers} workers)")
 
 
 if __name__ == "__main__":
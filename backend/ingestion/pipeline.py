@@ -0,0 +1,231 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.ingestion.build_dataset import detect_language, map_law_metadata
+from backend.ingestion.postprocess_dataset import (
+    WordTokenCounter,
+    clean_sections,
+    extract_sections,
+    load_word_token_counter,
+    normalize_text,
+    remove_toc_blocks,
+)
+from backend.utils.jsonl import JsonlWriter
+from backend.utils.manifest import (
+    IngestionManifest,
+    PreviousOutput,
+    diff_documents,
+    document_entry,
+    file_sha256,
+    manifest_path,
+    reuse_records,
+)
+from backend.utils.parallel import ordered_map
+
+STAGES = ("read", "normalize", "toc removal", "sectioning", "chunking")
+
+
+@lru_cache(maxsize=None)
+def _word_token_counter(tokenizer_id: Optional[str]) -> Optional[WordTokenCounter]:
+    # Cached per process, so each pool worker loads the tokenizer once.
+    return load_word_token_counter(tokenizer_id) if tokenizer_id else None
+
+
+def clean_statute(
+    txt_file: Path,
+    min_tokens: int,
+    max_tokens: int,
+    tokenizer_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    timings: Dict[str, float] = {}
+    clock = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal clock
+        now = time.perf_counter()
+        timings[stage] = now - clock
+        clock = now
+
+    law_name, domain = map_law_metadata(txt_file)
+    raw_text = txt_file.read_text(encoding="utf-8", errors="ignore")
+    lap("read")
+    normalized = normalize_text(raw_text)
+    lap("normalize")
+    normalized = remove_toc_blocks(normalized)
+    lap("toc removal")
+    sections = extract_sections(normalized)
+    lap("sectioning")
+    metadata = {
+        "law_name": law_name,
+        "domain": domain,
+        "jurisdiction": "Pakistan",
+        "source": "Statute",
+        "language": detect_language(normalized),
+    }
+    word_tokens = _word_token_counter(tokenizer_id)
+    records = list(clean_sections(txt_file.stem, metadata, sections, min_tokens, max_tokens, word_tokens))
+    lap("chunking")
+    return records, timings
+
+
+def _iter_cleaned(
+    txt_files: List[Path],
+    min_tokens: int,
+    max_tokens: int,
+    tokenizer_id: Optional[str],
+    workers: int,
+) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, float]]]:
+    if workers <= 1 or len(txt_files) <= 1:
+        for txt_file in txt_files:
+            yield clean_statute(txt_file, min_tokens, max_tokens, tokenizer_id)
+        return
+    workers = min(workers, len(txt_files))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from ordered_map(pool, clean_statute, txt_files, min_tokens, max_tokens, tokenizer_id, window=2 * workers)
+
+
+def run_pipeline(
+    input_dir: Path,
+    output_path: Path,
+    min_tokens: int = 300,
+    max_tokens: int = 500,
+    tokenizer_id: Optional[str] = None,
+    workers: int = 1,
+    force: bool = False,
+    build_index: bool = True,
+    full_rebuild: bool = False,
+    batch_size: int = 32,
+) -> Dict[str, Any]:
+    txt_files = sorted(input_dir.glob("*.txt"))
+    if not txt_files:
+        raise FileNotFoundError(f"No .txt files found in {input_dir}")
+    for txt_file in txt_files:
+        map_law_metadata(txt_file)
+
+    started = time.perf_counter()
+    # Statutes are cleaned straight from their source text, so there is no raw dataset to track.
+    params = {"source": "statute_text", "min_tokens": min_tokens, "max_tokens": max_tokens, "tokenizer": tokenizer_id}
+    previous = None if force else IngestionManifest.load_reusable(output_path, params)
+    input_hashes = {txt_file: file_sha256(txt_file) for txt_file in txt_files}
+    stale = [
+        txt_file
+        for txt_file in txt_files
+        if previous is None or not previous.is_current(txt_file.stem, input_hashes[txt_file])
+    ]
+
+    stage_seconds = {stage: 0.0 for stage in STAGES}
+    files: List[Dict[str, Any]] = []
+    documents: Dict[str, Dict[str, Any]] = {}
+    fresh = _iter_cleaned(stale, min_tokens, max_tokens, tokenizer_id, workers)
+    with JsonlWriter(output_path) as writer, PreviousOutput(output_path if previous else None) as cursor:
+        for txt_file in txt_files:
+            doc_records = None
+            timings: Dict[str, float] = {}
+            if txt_file not in stale:
+                doc_records = reuse_records(previous, cursor, txt_file.stem, input_hashes[txt_file])
+            reused = doc_records is not None
+            if txt_file in stale:
+                doc_records, timings = next(fresh)
+            elif doc_records is None:
+                doc_records, timings = clean_statute(txt_file, min_tokens, max_tokens, tokenizer_id)
+            for stage, seconds in timings.items():
+                stage_seconds[stage] += seconds
+            for record in doc_records:
+                writer.write(record)
+            documents[txt_file.stem] = document_entry(input_hashes[txt_file], doc_records)
+            files.append(
+                {
+                    "file": txt_file.name,
+                    "records": len(doc_records),
+                    "reused": reused,
+                    "seconds": round(sum(timings.values()), 3),
+                }
+            )
+
+    changed, removed = diff_documents(IngestionManifest.load(manifest_path(output_path)), documents)
+    IngestionManifest(params, documents, changed, removed).save(output_path)
+    result: Dict[str, Any] = {
+        "records": writer.count,
+        "files": files,
+        "changed_doc_ids": changed,
+        "removed_doc_ids": removed,
+        "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()},
+        "ingest_seconds": round(time.perf_counter() - started, 3),
+    }
+
+    if build_index:
+        # Imported here so a dataset-only run does not need the embedding stack.
+        from backend.services.retrieval_service import RetrievalService
+
+        # build_index streams the JSONL just written, so no second copy of the records is held here.
+        service = RetrievalService(dataset_path=output_path)
+        result["index"] = service.build_index(batch_size=batch_size, full_rebuild=full_rebuild)
+    return result
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    for item in sorted(result["files"], key=lambda entry: entry["seconds"], reverse=True):
+        status = "reused" if item["reused"] else "cleaned"
+        print(f"{item['seconds']:>8.2f}s  {item['records']:>7} records  {status:<7}  {item['file']}")
+    for stage, seconds in result["stage_seconds"].items():
+        print(f"{seconds:>8.2f}s  {stage}")
+    print(f"{result['ingest_seconds']:>8.2f}s  ingest total ({result['records']} records)")
+    index = result.get("index")
+    if index is None:
+        return
+    if index.get("skipped"):
+        print(f"{index['build_seconds']:>8.2f}s  index unchanged (v{index['index_version']})")
+        return
+    for stage, seconds in index.get("stage_seconds", {}).items():
+        print(f"{seconds:>8.2f}s  index: {stage}")
+    print(
+        f"{index['build_seconds']:>8.2f}s  index total (v{index['index_version']}, "
+        f"{index['encoded_chunks']} encoded, {index['reused_chunks']} reused)"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Ingest Pakistani statutes end to end: raw text -> clean dataset -> RAG index."
+    )
+    parser.add_argument("--input-dir", type=Path, required=True, help="Folder containing the statute .txt files")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).resolve().parents[1] / "data" / "legalease_rag_dataset_clean.jsonl",
+        help="Clean JSONL dataset path (the file /rag/build reads)",
+    )
+    parser.add_argument("--min-tokens", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=500)
+    parser.add_argument("--tokenizer", default=None, help="Hugging Face tokenizer id used to count chunk tokens")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to clean statutes in parallel")
+    parser.add_argument("--force", action="store_true", help="Re-clean every statute even if it is unchanged")
+    parser.add_argument("--skip-index", action="store_true", help="Write the dataset without building the index")
+    parser.add_argument("--full-rebuild", action="store_true", help="Re-embed every chunk")
+    parser.add_argument("--batch-size", type=int, default=32)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    result = run_pipeline(
+        args.input_dir,
+        args.output,
+        min_tokens=args.min_tokens,
+        max_tokens=args.max_tokens,
+        tokenizer_id=args.tokenizer,
+        workers=args.workers,
+        force=args.force,
+        build_index=not args.skip_index,
+        full_rebuild=args.full_rebuild,
+        batch_size=args.batch_size,
+    )
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
 import argparse
-import json
 import re
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import groupby
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from backend.utils.jsonl import JsonlWriter, iter_records
+from backend.utils.manifest import (
+    IngestionManifest,
+    PreviousOutput,
+    diff_documents,
+    document_entry,
+    manifest_path,
+    records_sha256,
+    reuse_records,
+)
 
 
 SECTION_NUMBER_PATTERN = re.compile(
@@ -176,49 +188,114 @@ def is_non_substantive_section(section: Section) -> bool:
     return False
 
 
+WordTokenCounter = Callable[[str], int]
+
+
 def estimate_tokens(text: str) -> int:
-    words = len(text.split())
-    return int(words * 1.3)
+    return estimate_word_tokens(len(text.split()))
 
 
-def chunk_section_text(text: str, min_tokens: int, max_tokens: int) -> Iterable[str]:
-    words = text.split()
-    if not words:
-        return []
+def estimate_word_tokens(word_count: int) -> int:
+    return int(word_count * 1.3)
+
 
+def load_word_token_counter(tokenizer_id: str) -> WordTokenCounter:
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_id)
+
+    # Words repeat heavily in statutes, so each distinct word is tokenised once.
+    @lru_cache(maxsize=200000)
+    def count(word: str) -> int:
+        return len(tokenizer.tokenize(word))
+
+    return count
+
+
+def _chunk_by_estimate(words: List[str], min_tokens: int, max_tokens: int) -> List[str]:
     chunks: List[str] = []
-    current: List[str] = []
-    current_tokens = 0
-
-    for word in words:
-        current.append(word)
-        current_tokens = estimate_tokens(" ".join(current))
-        if current_tokens >= max_tokens:
-            chunks.append(" ".join(current).strip())
-            current = []
-            current_tokens = 0
-
-    if current:
-        if chunks and estimate_tokens(" ".join(current)) < min_tokens:
-            chunks[-1] = (chunks[-1] + " " + " ".join(current)).strip()
+    start = 0
+    for idx in range(len(words)):
+        if estimate_word_tokens(idx + 1 - start) >= max_tokens:
+            chunks.append(" ".join(words[start:idx + 1]))
+            start = idx + 1
+
+    if start < len(words):
+        tail = " ".join(words[start:])
+        if chunks and estimate_word_tokens(len(words) - start) < min_tokens:
+            chunks[-1] = chunks[-1] + " " + tail
         else:
-            chunks.append(" ".join(current).strip())
-
+            chunks.append(tail)
     return chunks
 
 
-def load_dataset(path: Path) -> List[Dict]:
-    records = json.loads(path.read_text(encoding="utf-8"))
-    for idx, record in enumerate(records):
+def _chunk_by_tokenizer(
+    words: List[str], min_tokens: int, max_tokens: int, word_tokens: WordTokenCounter
+) -> List[str]:
+    spans: List[Tuple[int, int, int]] = []
+    start = 0
+    tokens = 0
+    for idx, word in enumerate(words):
+        cost = word_tokens(word)
+        # Close the chunk before the word that would overflow, so no chunk exceeds max_tokens.
+        if idx > start and tokens + cost > max_tokens:
+            spans.append((start, idx, tokens))
+            start = idx
+            tokens = 0
+        tokens += cost
+
+    if spans and tokens < min_tokens and spans[-1][2] + tokens <= max_tokens:
+        prev_start, _, prev_tokens = spans.pop()
+        spans.append((prev_start, len(words), prev_tokens + tokens))
+    else:
+        spans.append((start, len(words), tokens))
+    return [" ".join(words[span_start:span_end]) for span_start, span_end, _ in spans]
+
+
+def chunk_section_text(
+    text: str,
+    min_tokens: int,
+    max_tokens: int,
+    word_tokens: Optional[WordTokenCounter] = None,
+) -> List[str]:
+    words = text.split()
+    if not words:
+        return []
+    if word_tokens is None:
+        return _chunk_by_estimate(words, min_tokens, max_tokens)
+    return _chunk_by_tokenizer(words, min_tokens, max_tokens, word_tokens)
+
+
+def load_dataset(path: Path) -> Iterator[Dict]:
+    for idx, record in enumerate(iter_records(path)):
         record["__index"] = idx
-    return records
+        yield record
 
 
-def group_by_doc(records: List[Dict]) -> Dict[str, List[Dict]]:
-    grouped: Dict[str, List[Dict]] = {}
+def docs_contiguous(records: Iterable[Dict]) -> bool:
+    seen: Set[str] = set()
+    previous = None
     for record in records:
-        grouped.setdefault(record["doc_id"], []).append(record)
-    return grouped
+        doc_id = record["doc_id"]
+        if doc_id != previous:
+            if doc_id in seen:
+                return False
+            seen.add(doc_id)
+            previous = doc_id
+    return True
+
+
+def group_by_doc(records: Iterable[Dict], contiguous: bool = True) -> Iterator[Tuple[str, List[Dict]]]:
+    if not contiguous:
+        # Legacy or hand-merged input interleaves statutes, so fall back to holding every document.
+        grouped: Dict[str, List[Dict]] = {}
+        for record in records:
+            grouped.setdefault(record["doc_id"], []).append(record)
+        yield from grouped.items()
+        return
+    # build_dataset writes each statute contiguously, so only one document is held at a time.
+    for doc_id, doc_records in groupby(records, key=lambda record: record["doc_id"]):
+        yield doc_id, list(doc_records)
 
 
 def rebuild_text(records: List[Dict]) -> str:
@@ -226,61 +303,110 @@ def rebuild_text(records: List[Dict]) -> str:
     return "\n\n".join(r.get("text", "") for r in records_sorted if r.get("text"))
 
 
-def clean_dataset(input_path: Path, output_path: Path) -> None:
-    records = load_dataset(input_path)
-    grouped = group_by_doc(records)
-    cleaned_records: List[Dict] = []
-
-    for doc_id, doc_records in grouped.items():
-        sample = doc_records[0]
-        law_name = sample.get("law_name", doc_id)
-        domain = sample.get("domain", "")
-        jurisdiction = sample.get("jurisdiction", "Pakistan")
-        source = sample.get("source", "Statute")
-        language = sample.get("language", "en")
-
-        raw_text = rebuild_text(doc_records)
-        normalized = normalize_text(raw_text)
-        normalized = remove_toc_blocks(normalized)
-        sections = extract_sections(normalized)
-
-        for section in sections:
-            if is_non_substantive_section(section):
-                continue
+def document_metadata(doc_id: str, sample: Dict) -> Dict[str, str]:
+    return {
+        "law_name": sample.get("law_name", doc_id),
+        "domain": sample.get("domain", ""),
+        "jurisdiction": sample.get("jurisdiction", "Pakistan"),
+        "source": sample.get("source", "Statute"),
+        "language": sample.get("language", "en"),
+    }
+
+
+def clean_sections(
+    doc_id: str,
+    metadata: Dict[str, str],
+    sections: List[Section],
+    min_tokens: int = 300,
+    max_tokens: int = 500,
+    word_tokens: Optional[WordTokenCounter] = None,
+) -> Iterator[Dict]:
+    for section in sections:
+        if is_non_substantive_section(section):
+            continue
 
-            section_title = clean_section_title(section.title)
-            chunk_texts = chunk_section_text(section.text, min_tokens=300, max_tokens=500)
-            for idx, chunk in enumerate(chunk_texts):
-                cleaned_records.append(
-                    {
-                        "doc_id": doc_id,
-                        "law_name": law_name,
-                        "domain": domain,
-                        "jurisdiction": jurisdiction,
-                        "source": source,
-                        "language": language,
-                        "section_id": section.section_id,
-                        "section_title": section_title,
-                        "chunk_id": f"{doc_id}::sec-{section.section_id}::chunk-{idx}",
-                        "chunk_index": idx,
-                        "text": chunk,
-                    }
-                )
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(cleaned_records, ensure_ascii=False, indent=2), encoding="utf-8")
+        section_title = clean_section_title(section.title)
+        chunk_texts = chunk_section_text(
+            section.text, min_tokens=min_tokens, max_tokens=max_tokens, word_tokens=word_tokens
+        )
+        for idx, chunk in enumerate(chunk_texts):
+            yield {
+                "doc_id": doc_id,
+                **metadata,
+                "section_id": section.section_id,
+                "section_title": section_title,
+                "chunk_id": f"{doc_id}::sec-{section.section_id}::chunk-{idx}",
+                "chunk_index": idx,
+                "text": chunk,
+            }
+
+
+def clean_document(
+    doc_id: str,
+    doc_records: List[Dict],
+    min_tokens: int = 300,
+    max_tokens: int = 500,
+    word_tokens: Optional[WordTokenCounter] = None,
+) -> Iterator[Dict]:
+    raw_text = rebuild_text(doc_records)
+    normalized = normalize_text(raw_text)
+    normalized = remove_toc_blocks(normalized)
+    sections = extract_sections(normalized)
+    metadata = document_metadata(doc_id, doc_records[0])
+    yield from clean_sections(doc_id, metadata, sections, min_tokens, max_tokens, word_tokens)
+
+
+def clean_dataset(
+    input_path: Path,
+    output_path: Path,
+    min_tokens: int = 300,
+    max_tokens: int = 500,
+    tokenizer_id: Optional[str] = None,
+    force: bool = False,
+) -> int:
+    params = {"min_tokens": min_tokens, "max_tokens": max_tokens, "tokenizer": tokenizer_id}
+    previous = None if force else IngestionManifest.load_reusable(output_path, params)
+    word_tokens: Optional[WordTokenCounter] = None
+    documents: Dict[str, Dict] = {}
+    contiguous = docs_contiguous(iter_records(input_path))
+
+    with JsonlWriter(output_path) as writer, PreviousOutput(output_path if previous else None) as cursor:
+        for doc_id, doc_records in group_by_doc(load_dataset(input_path), contiguous):
+            input_hash = records_sha256(doc_records)
+            records = reuse_records(previous, cursor, doc_id, input_hash)
+            if records is None:
+                # Loading a tokenizer takes seconds, so only pay for it when a document needs re-chunking.
+                if tokenizer_id and word_tokens is None:
+                    word_tokens = load_word_token_counter(tokenizer_id)
+                records = list(clean_document(doc_id, doc_records, min_tokens, max_tokens, word_tokens))
+            for record in records:
+                writer.write(record)
+            documents[doc_id] = document_entry(input_hash, records)
+
+    changed, removed = diff_documents(IngestionManifest.load(manifest_path(output_path)), documents)
+    IngestionManifest(params, documents, changed, removed).save(output_path)
+    return writer.count
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Post-process a Pakistani statutes RAG dataset.")
-    parser.add_argument("--input", type=Path, required=True, help="Input JSON dataset path")
-    parser.add_argument("--output", type=Path, required=True, help="Output JSON dataset path")
+    parser.add_argument("--input", type=Path, required=True, help="Input JSONL (or legacy JSON array) dataset path")
+    parser.add_argument("--output", type=Path, required=True, help="Output JSONL dataset path")
+    parser.add_argument("--min-tokens", type=int, default=300)
+    parser.add_argument("--max-tokens", type=int, default=500)
+    parser.add_argument(
+        "--tokenizer",
+        default=None,
+        help="Hugging Face tokenizer id (e.g. intfloat/multilingual-e5-small) used to count tokens "
+        "instead of the words * 1.3 estimate",
+    )
+    parser.add_argument("--force", action="store_true", help="Re-clean every document even if it is unchanged")
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    clean_dataset(args.input, args.output)
+    clean_dataset(args.input, args.output, args.min_tokens, args.max_tokens, args.tokenizer, args.force)
 
 
 if __name__ == "__main__":
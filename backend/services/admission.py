@@ -0,0 +1,161 @@
+import asyncio
+import bisect
+import itertools
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Hashable, List, Optional
+
+PRIORITIES = {"interactive": 0, "standard": 1, "batch": 2}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int = 5) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    rank: int
+    sequence: int
+    priority: str = field(compare=False)
+    user_id: Optional[Hashable] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class AdmissionController:
+    # All state is touched from the event loop only, so no lock is needed.
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue_depth: int = 32,
+        per_user_limit: int = 0,
+        class_limits: Optional[Dict[str, int]] = None,
+        retry_after: int = 5,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.per_user_limit = max(0, per_user_limit)
+        self.class_limits = {
+            priority: max(1, limit) for priority, limit in (class_limits or {}).items() if priority in PRIORITIES
+        }
+        self.retry_after = retry_after
+        self.running = 0
+        self._running_by_class: Counter = Counter()
+        self._user_load: Counter = Counter()
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._admitted: Counter = Counter()
+        self._rejected: Counter = Counter()
+        self._waits: Dict[str, Deque[float]] = {priority: deque(maxlen=500) for priority in PRIORITIES}
+        self.cancelled = 0
+
+    def _can_start(self, priority: str) -> bool:
+        if self.running >= self.max_concurrency:
+            return False
+        limit = self.class_limits.get(priority)
+        return limit is None or self._running_by_class[priority] < limit
+
+    def check(self, priority: str = "standard", user_id: Optional[Hashable] = None) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+        if user_id is not None and self.per_user_limit and self._user_load[user_id] >= self.per_user_limit:
+            self._rejected["user_limit"] += 1
+            raise AdmissionRejected(429, f"Too many concurrent {self.name} requests", self.retry_after)
+        if len(self._waiters) >= self.max_queue_depth and not self._can_start(priority):
+            self._rejected["queue_full"] += 1
+            raise AdmissionRejected(503, f"The {self.name} queue is full, try again shortly", self.retry_after)
+
+    def _start(self, priority: str) -> None:
+        self.running += 1
+        self._running_by_class[priority] += 1
+        self._admitted[priority] += 1
+
+    def _dispatch(self) -> None:
+        # Highest priority first, FIFO within a class; a class at its own cap does not block the classes behind it.
+        idx = 0
+        while idx < len(self._waiters) and self.running < self.max_concurrency:
+            waiter = self._waiters[idx]
+            if self._can_start(waiter.priority):
+                self._waiters.pop(idx)
+                self._start(waiter.priority)
+                waiter.future.set_result(None)
+            else:
+                idx += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "standard", user_id: Optional[Hashable] = None) -> AsyncIterator[float]:
+        self.check(priority, user_id)
+        rank = PRIORITIES[priority]
+        enqueued_at = time.perf_counter()
+        self._user_load[user_id] += 1
+        if self._can_start(priority) and not any(waiter.rank <= rank for waiter in self._waiters):
+            self._start(priority)
+        else:
+            waiter = _Waiter(rank, next(self._sequence), priority, user_id, asyncio.get_running_loop().create_future())
+            bisect.insort(self._waiters, waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._release_user(user_id)
+                else:
+                    self._release(priority, user_id)
+                raise
+        wait_ms = (time.perf_counter() - enqueued_at) * 1000.0
+        self._waits[priority].append(wait_ms)
+        try:
+            yield wait_ms
+        finally:
+            self._release(priority, user_id)
+
+    def _release_user(self, user_id: Optional[Hashable]) -> None:
+        self._user_load[user_id] -= 1
+        if self._user_load[user_id] <= 0:
+            del self._user_load[user_id]
+
+    def _release(self, priority: str, user_id: Optional[Hashable]) -> None:
+        self.running -= 1
+        self._running_by_class[priority] -= 1
+        self._release_user(user_id)
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        waits: Dict[str, Any] = {}
+        for priority, values in self._waits.items():
+            samples = list(values)
+            waits[priority] = {
+                "samples": len(samples),
+                "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+                "p95_ms": round(_percentile(samples, 0.95), 3) if samples else 0.0,
+                "max_ms": round(max(samples), 3) if samples else 0.0,
+            }
+        queued = Counter(waiter.priority for waiter in self._waiters)
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+            "per_user_limit": self.per_user_limit,
+            "class_limits": dict(self.class_limits),
+            "running": self.running,
+            "running_by_class": {priority: self._running_by_class[priority] for priority in PRIORITIES},
+            "queued": len(self._waiters),
+            "queued_by_class": {priority: queued[priority] for priority in PRIORITIES},
+            "admitted": {priority: self._admitted[priority] for priority in PRIORITIES},
+            "rejected": {"queue_full": self._rejected["queue_full"], "user_limit": self._rejected["user_limit"]},
+            "cancelled": self.cancelled,
+            "queue_wait": waits,
+        }
@@ -0,0 +1,170 @@
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from backend.services.index_store import atomic_savez
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    top_k = max(1, min(top_k, len(scores)))
+    if top_k < len(scores):
+        candidates = np.argpartition(scores, -top_k)[-top_k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def exact_search(embeddings: np.ndarray, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores = np.dot(embeddings, query)
+    best = top_k_indices(scores, top_k)
+    return best, scores[best]
+
+
+def _spherical_kmeans(
+    vectors: np.ndarray,
+    n_lists: int,
+    n_iter: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(np.dot(vectors, centroids.T), axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_lists)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty lists so every centroid keeps covering part of the corpus.
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+def _assign(embeddings: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    assignments = np.empty(len(embeddings), dtype=np.int32)
+    for start in range(0, len(embeddings), batch_size):
+        block = embeddings[start:start + batch_size]
+        assignments[start:start + batch_size] = np.argmax(np.dot(block, centroids.T), axis=1)
+    return assignments
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray) -> None:
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_iter: int = 10,
+        train_size: Optional[int] = None,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        total = len(embeddings)
+        if total == 0:
+            raise ValueError("Cannot build an IVF index over an empty embedding matrix.")
+        n_lists = n_lists or int(os.getenv("RAG_IVF_LISTS", "0")) or max(1, int(np.sqrt(total)))
+        n_lists = max(1, min(n_lists, total))
+
+        rng = np.random.default_rng(seed)
+        train_size = min(total, train_size or max(64 * n_lists, 10000))
+        train_ids = rng.choice(total, size=train_size, replace=False) if train_size < total else np.arange(total)
+        centroids = _spherical_kmeans(np.asarray(embeddings[train_ids], dtype=np.float32), n_lists, n_iter, rng)
+
+        assignments = _assign(embeddings, centroids)
+        list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(counts, out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_ids)
+
+    def search(
+        self,
+        embeddings: np.ndarray,
+        query: np.ndarray,
+        top_k: int,
+        n_probe: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        n_probe = n_probe or int(os.getenv("RAG_IVF_NPROBE", "8"))
+        n_probe = max(1, min(n_probe, self.n_lists))
+        probed = top_k_indices(np.dot(self.centroids, query), n_probe)
+        candidates = np.concatenate(
+            [self.list_ids[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed]
+        )
+        if len(candidates) == 0:
+            return exact_search(embeddings, query, top_k)
+        candidates.sort()
+        scores = np.dot(embeddings[candidates], query)
+        best = top_k_indices(scores, top_k)
+        return candidates[best], scores[best]
+
+    def save(self, path: Path) -> None:
+        atomic_savez(
+            path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_ids=self.list_ids,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        data = np.load(path)
+        return cls(
+            data["centroids"].astype(np.float32),
+            data["list_offsets"].astype(np.int64),
+            data["list_ids"].astype(np.int64),
+        )
+
+
+def measure_recall(
+    embeddings: np.ndarray,
+    search_fn,
+    top_k: int = 10,
+    sample_size: int = 200,
+    seed: int = 0,
+) -> float:
+    total = len(embeddings)
+    if total == 0:
+        return 0.0
+    rng = np.random.default_rng(seed)
+    probes = rng.choice(total, size=min(sample_size, total), replace=False)
+    top_k = min(top_k, total)
+    hits = 0
+    for idx in probes:
+        query = np.asarray(embeddings[idx], dtype=np.float32)
+        expected, _ = exact_search(embeddings, query, top_k)
+        found, _ = search_fn(query, top_k)
+        hits += len(set(expected.tolist()) & set(found.tolist()))
+    return hits / float(len(probes) * top_k)
+
+
+def measure_latency_ms(
+    embeddings: np.ndarray,
+    search_fn,
+    top_k: int = 10,
+    sample_size: int = 20,
+    seed: int = 1,
+) -> float:
+    total = len(embeddings)
+    if total == 0:
+        return 0.0
+    rng = np.random.default_rng(seed)
+    probes = rng.choice(total, size=min(sample_size, total), replace=False)
+    samples = []
+    for idx in probes:
+        query = np.asarray(embeddings[idx], dtype=np.float32)
+        started = time.perf_counter()
+        search_fn(query, min(top_k, total))
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return float(np.median(samples))
@@ -0,0 +1,150 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.services.cache import TTLCache
+
+
+@dataclass
+class _Variant:
+    query: str
+    embedding: Optional[np.ndarray]
+    answer: str
+    stored_at: float
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").split()).casefold()
+
+
+def history_hash(history_block: str) -> str:
+    if not history_block:
+        return ""
+    return hashlib.sha256(history_block.encode("utf-8")).hexdigest()
+
+
+def context_key(
+    chunk_ids: Sequence[Any],
+    language: str,
+    max_new_tokens: int,
+    history_digest: str,
+) -> Tuple[Hashable, ...]:
+    return (tuple(sorted(str(chunk_id) for chunk_id in chunk_ids)), language, max_new_tokens, history_digest)
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl_seconds: float = 3600.0,
+        similarity: float = 0.0,
+        max_variants: int = 8,
+    ) -> None:
+        # Entries are grouped by retrieved context; each group keeps a few phrasings of the question.
+        self._groups = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.similarity = similarity
+        self.max_variants = max(1, max_variants)
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._groups.max_size > 0
+
+    def _sync_version(self, version: Optional[int]) -> None:
+        with self._lock:
+            if version == self._version:
+                return
+            # Answers were generated from the previous index's chunks.
+            if self._version is not None:
+                self._groups.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def _live_variants(self, key: Hashable) -> List[_Variant]:
+        variants = self._groups.get(key) or []
+        ttl = self._groups.ttl_seconds
+        now = time.monotonic()
+        return [variant for variant in variants if not ttl or now - variant.stored_at <= ttl]
+
+    def get(
+        self,
+        version: Optional[int],
+        key: Hashable,
+        query: str,
+        embed: Optional[Callable[[], Optional[np.ndarray]]] = None,
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if not self.enabled:
+            return None, None
+        self._sync_version(version)
+        normalized = normalize_query(query)
+        variants = self._live_variants(key)
+        for variant in variants:
+            if variant.query == normalized:
+                with self._lock:
+                    self.exact_hits += 1
+                return variant.answer, {"match": "exact"}
+        # The query is only embedded once its exact phrasing has missed and a stored variant could match it.
+        embedded = [variant for variant in variants if variant.embedding is not None]
+        embedding = embed() if self.similarity > 0 and embed is not None and embedded else None
+        if embedding is not None:
+            best: Optional[_Variant] = None
+            best_score = -1.0
+            for variant in embedded:
+                score = float(np.dot(variant.embedding, embedding))
+                if score > best_score:
+                    best, best_score = variant, score
+            if best is not None and best_score >= self.similarity:
+                with self._lock:
+                    self.similar_hits += 1
+                return best.answer, {"match": "similar", "similarity": round(best_score, 4), "cached_query": best.query}
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(
+        self,
+        version: Optional[int],
+        key: Hashable,
+        query: str,
+        answer: str,
+        embedding: Optional[np.ndarray] = None,
+    ) -> None:
+        if not self.enabled or not (answer or "").strip():
+            return
+        self._sync_version(version)
+        normalized = normalize_query(query)
+        variants = [variant for variant in self._live_variants(key) if variant.query != normalized]
+        variants.append(_Variant(normalized, embedding, answer, time.monotonic()))
+        self._groups.put(key, variants[-self.max_variants:])
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        groups = self._groups.stats()
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "index_version": self._version,
+                "contexts": groups["size"],
+                "max_size": groups["max_size"],
+                "ttl_seconds": groups["ttl_seconds"],
+                "similarity_threshold": self.similarity,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": groups["evictions"],
+                "expirations": groups["expirations"],
+                "invalidations": self.invalidations,
+            }
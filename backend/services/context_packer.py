@@ -0,0 +1,143 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+TokenCounter = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text.split()) * 1.3)
+
+
+@dataclass
+class ContextBlock:
+    law_name: str
+    section_id: str
+    rank: int
+    words: List[str] = field(default_factory=list)
+    hits: List[Dict[str, Any]] = field(default_factory=list)
+    last_chunk_index: Optional[int] = None
+    tokens: int = 0
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        return [str(hit.get("chunk_id")) for hit in self.hits]
+
+
+def _overlap_length(left: Sequence[str], right: Sequence[str]) -> int:
+    # Longest suffix of left that is a prefix of right, via the KMP failure function over right + sentinel + tail.
+    tail = left[-len(right):] if right else []
+    sequence: List[Optional[str]] = list(right) + [None] + list(tail)
+    failure = [0] * len(sequence)
+    for idx in range(1, len(sequence)):
+        length = failure[idx - 1]
+        while length and sequence[idx] != sequence[length]:
+            length = failure[length - 1]
+        if sequence[idx] == sequence[length]:
+            length += 1
+        failure[idx] = length
+    return failure[-1] if sequence else 0
+
+
+def _chunk_index(hit: Dict[str, Any]) -> Optional[int]:
+    value = hit.get("chunk_index")
+    if value is None:
+        # Indexes built before retrieval metadata kept chunk_index still carry it in the chunk id.
+        chunk_id = str(hit.get("chunk_id") or "")
+        tail = chunk_id.rsplit("::chunk-", 1)
+        value = tail[1] if len(tail) == 2 else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_blocks(matches: Sequence[Dict[str, Any]]) -> Tuple[List[ContextBlock], int]:
+    groups: Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]] = {}
+    for rank, hit in enumerate(matches):
+        key = (str(hit.get("law_name") or ""), str(hit.get("section_id") or ""))
+        groups.setdefault(key, []).append((rank, hit))
+
+    blocks: List[ContextBlock] = []
+    seen_texts = set()
+    duplicate_words = 0
+    for (law_name, section_id), hits in groups.items():
+        hits.sort(key=lambda pair: (_chunk_index(pair[1]) is None, _chunk_index(pair[1]) or 0, pair[0]))
+        block: Optional[ContextBlock] = None
+        for rank, hit in hits:
+            words = (hit.get("text") or "").split()
+            digest = hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+            if not words or digest in seen_texts:
+                duplicate_words += len(words)
+                continue
+            seen_texts.add(digest)
+            index = _chunk_index(hit)
+            adjacent = (
+                block is not None
+                and index is not None
+                and block.last_chunk_index is not None
+                and index - block.last_chunk_index <= 1
+            )
+            if not adjacent:
+                block = ContextBlock(law_name=law_name, section_id=section_id, rank=rank)
+                blocks.append(block)
+            overlap = _overlap_length(block.words, words) if block.words else 0
+            duplicate_words += overlap
+            block.words.extend(words[overlap:])
+            block.hits.append(hit)
+            block.rank = min(block.rank, rank)
+            block.last_chunk_index = index
+    blocks.sort(key=lambda item: item.rank)
+    return blocks, duplicate_words
+
+
+def _truncate(block: ContextBlock, budget: int, count_tokens: TokenCounter) -> None:
+    low, high = 0, len(block.words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(block.words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    block.words = block.words[:low]
+    block.tokens = count_tokens(block.text)
+
+
+def pack_context(
+    matches: Sequence[Dict[str, Any]],
+    token_budget: int,
+    count_tokens: TokenCounter = estimate_tokens,
+    required_hits: int = 1,
+    min_block_tokens: int = 32,
+) -> Tuple[List[ContextBlock], Dict[str, Any]]:
+    blocks, duplicate_words = build_blocks(matches)
+    packed: List[ContextBlock] = []
+    remaining = token_budget
+    for block in blocks:
+        if remaining < min_block_tokens:
+            break
+        block.tokens = count_tokens(block.text)
+        if block.tokens > remaining:
+            # The best-ranked hits always get in, cut to fit; lower-ranked blocks that overflow are skipped.
+            if block.rank >= required_hits:
+                continue
+            _truncate(block, remaining, count_tokens)
+            if not block.words:
+                continue
+        packed.append(block)
+        remaining -= block.tokens
+
+    stats = {
+        "candidates": len(matches),
+        "blocks": len(packed),
+        "chunks": sum(len(block.hits) for block in packed),
+        "tokens": token_budget - remaining,
+        "token_budget": token_budget,
+        "verbatim_tokens": sum(count_tokens(hit.get("text") or "") for hit in matches[:max(required_hits, 1)]),
+        "deduplicated_words": duplicate_words,
+    }
+    return packed, stats
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+ONNX_QUANTIZATIONS = ("none", "avx2", "avx512", "avx512_vnni", "arm64")
+
+
+def onnx_file_name(quantization: str) -> str:
+    if quantization == "none":
+        return "onnx/model.onnx"
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def _export_onnx(model_id: str, export_dir: Path, quantization: str) -> None:
+    try:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+    except ImportError as exc:  # pragma: no cover
+        raise RuntimeError(
+            "ONNX embedding backend needs sentence-transformers>=3.2 and optimum[onnxruntime]."
+        ) from exc
+
+    model = SentenceTransformer(model_id, backend="onnx", device="cpu")
+    model.save_pretrained(str(export_dir))
+    if quantization != "none":
+        export_dynamic_quantized_onnx_model(model, quantization, str(export_dir))
+
+
+def load_embedding_model(
+    model_id: str,
+    backend: str = "torch",
+    quantization: str = "none",
+    export_dir: Optional[Path] = None,
+) -> SentenceTransformer:
+    if backend == "torch":
+        return SentenceTransformer(model_id)
+    if backend != "onnx":
+        raise ValueError(f"Unsupported embedding backend '{backend}'. Use one of: {', '.join(EMBEDDING_BACKENDS)}")
+    if quantization not in ONNX_QUANTIZATIONS:
+        raise ValueError(f"Unsupported ONNX quantization '{quantization}'. Use one of: {', '.join(ONNX_QUANTIZATIONS)}")
+
+    file_name = onnx_file_name(quantization)
+    if export_dir is None:
+        return SentenceTransformer(model_id, backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+    if not (export_dir / file_name).exists():
+        # Export once; later starts load the graph from disk without touching the torch weights.
+        _export_onnx(model_id, export_dir, quantization)
+    return SentenceTransformer(str(export_dir), backend="onnx", device="cpu", model_kwargs={"file_name": file_name})
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    cosine = np.sum(reference * candidate, axis=1)
+    return {"min_cosine": round(float(cosine.min()), 6), "mean_cosine": round(float(cosine.mean()), 6)}
+
+
+def verify_backend(
+    model: SentenceTransformer,
+    model_id: str,
+    passages: Sequence[str],
+    min_cosine: float,
+) -> Dict[str, Any]:
+    # The index may mix vectors from both backends, so each must stay close to the torch reference.
+    reference_model = SentenceTransformer(model_id)
+    reference = np.asarray(reference_model.encode(list(passages), normalize_embeddings=True), dtype=np.float32)
+    candidate = np.asarray(model.encode(list(passages), normalize_embeddings=True), dtype=np.float32)
+    report: Dict[str, Any] = {
+        "samples": len(passages),
+        "required_min_cosine": min_cosine,
+        **compare_embeddings(reference, candidate),
+    }
+    report["passed"] = report["min_cosine"] >= min_cosine
+    return report
@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EncodeFn = Callable[[Sequence[str]], np.ndarray]
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode_fn: EncodeFn, max_batch_size: int = 16, max_wait_ms: float = 2.0) -> None:
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._histogram: Counter = Counter()
+        self.requests = 0
+        self.batches = 0
+        self.encoded_texts = 0
+        self.total_wait_ms = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _collect(self) -> List[Tuple[str, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # With no wait budget, still sweep up whatever queued while the last batch was encoding.
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            # Identical queries that land in the same batch are encoded once.
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+            rows = {text: vectors[idx] for idx, text in enumerate(texts)}
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.encoded_texts += len(texts)
+                self._histogram[len(batch)] += 1
+                self.total_wait_ms += sum((started - submitted_at) * 1000.0 for _, _, submitted_at in batch)
+            for text, future, _ in batch:
+                future.set_result(rows[text].copy())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "requests": self.requests,
+                "batches": self.batches,
+                "encoded_texts": self.encoded_texts,
+                "mean_batch_size": round(self.requests / self.batches, 3) if self.batches else 0.0,
+                "mean_queue_wait_ms": round(self.total_wait_ms / self.requests, 3) if self.requests else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._histogram.items())},
+                "queued": self._queue.qsize(),
+            }
@@ -0,0 +1,354 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, InvalidStateError
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+KVLayers = List[Tuple[Any, Any]]
+
+
+@dataclass
+class GenerationResult:
+    text: str
+    new_tokens: int
+    queue_ms: float
+    ttft_ms: float
+    total_ms: float
+    tokens_per_s: float
+
+
+@dataclass
+class _Sequence:
+    input_ids: Any
+    max_new_tokens: int
+    future: Future
+    submitted_at: float
+    streamer: Any = None
+    past_key_values: Any = None
+    started_at: float = 0.0
+    first_token_at: float = 0.0
+    position: int = 0
+    tokens: List[int] = field(default_factory=list)
+
+
+def _cache_layers(cache: Any) -> KVLayers:
+    if hasattr(cache, "to_legacy_cache"):
+        return list(cache.to_legacy_cache())
+    return list(cache)
+
+
+def _as_cache(layers: KVLayers) -> Any:
+    from transformers import DynamicCache
+
+    return DynamicCache.from_legacy_cache(tuple(layers))
+
+
+class GenerationScheduler:
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        torch_module: Any,
+        max_batch_size: int = 8,
+        eos_token_ids: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.model = model
+        self.tokenizer = tokenizer
+        self._torch = torch_module
+        self.max_batch_size = max(1, max_batch_size)
+        if eos_token_ids is None:
+            configured = getattr(getattr(model, "generation_config", None), "eos_token_id", None)
+            if configured is None:
+                configured = []
+            elif isinstance(configured, int):
+                configured = [configured]
+            eos_token_ids = list(configured) + [tokenizer.eos_token_id]
+        self.eos_token_ids: Set[int] = {int(token) for token in eos_token_ids if token is not None}
+        self._queue: "queue.Queue[_Sequence]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        # Batch state, touched only by the worker thread: one KV row and one attention-mask row per active sequence.
+        self._active: List[_Sequence] = []
+        self._layers: Optional[KVLayers] = None
+        self._cache: Any = None
+        self._mask: Any = None
+        self._histogram: Counter = Counter()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.tokens_saved = 0
+        self.decode_steps = 0
+        self.generated_tokens = 0
+        self.total_queue_ms = 0.0
+        self.total_ttft_ms = 0.0
+        self.total_tokens_per_s = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="generation-scheduler", daemon=True)
+                self._worker.start()
+
+    def submit(self, input_ids: Any, max_new_tokens: int, streamer: Any = None, past_key_values: Any = None) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        with self._lock:
+            self.requests += 1
+        self._queue.put(
+            _Sequence(
+                input_ids=input_ids,
+                max_new_tokens=max(1, max_new_tokens),
+                future=future,
+                submitted_at=time.perf_counter(),
+                streamer=streamer,
+                past_key_values=past_key_values,
+            )
+        )
+        return future
+
+    def _admit(self) -> List[_Sequence]:
+        arrivals: List[_Sequence] = []
+        if not self._active:
+            arrivals.append(self._queue.get())
+        # New prompts join at the next decode step instead of waiting for the running batch to drain.
+        while len(self._active) + len(arrivals) < self.max_batch_size:
+            try:
+                arrivals.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        live = []
+        for seq in arrivals:
+            if seq.future.cancelled():
+                self._record_cancelled(seq)
+            else:
+                live.append(seq)
+        return live
+
+    def _record_cancelled(self, seq: _Sequence) -> None:
+        if seq.streamer is not None:
+            seq.streamer.end()
+        with self._lock:
+            self.cancelled += 1
+            # Upper bound: the sequence might have reached EOS before using its whole budget.
+            self.tokens_saved += max(0, seq.max_new_tokens - len(seq.tokens))
+
+    def _append_token(self, seq: _Sequence, token: int) -> None:
+        if not seq.tokens:
+            seq.first_token_at = time.perf_counter()
+        seq.tokens.append(token)
+        if seq.streamer is not None:
+            seq.streamer.put(self._torch.tensor([token]))
+
+    def _done(self, seq: _Sequence) -> bool:
+        # A caller that timed out or disconnected cancels its future; the row is evicted at the next step.
+        return (
+            seq.future.cancelled()
+            or seq.tokens[-1] in self.eos_token_ids
+            or len(seq.tokens) >= seq.max_new_tokens
+        )
+
+    def _prefill(self, seq: _Sequence) -> KVLayers:
+        torch = self._torch
+        seq.started_at = time.perf_counter()
+        input_ids = seq.input_ids.to(self.model.device)
+        # A cached prompt prefix leaves only the remaining prompt tokens to prefill.
+        cached = seq.past_key_values.get_seq_length() if seq.past_key_values is not None else 0
+        with torch.inference_mode():
+            outputs = self.model(
+                input_ids=input_ids[:, cached:],
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=seq.past_key_values,
+                use_cache=True,
+            )
+        seq.past_key_values = None
+        if seq.streamer is not None:
+            seq.streamer.put(input_ids.cpu())
+        seq.position = input_ids.shape[-1]
+        self._append_token(seq, int(outputs.logits[0, -1].argmax()))
+        return _cache_layers(outputs.past_key_values)
+
+    def _join(self, seq: _Sequence, layers: KVLayers) -> None:
+        torch = self._torch
+        pad = torch.nn.functional.pad
+        length = seq.position
+        mask = torch.ones((1, length), dtype=torch.long, device=self.model.device)
+        if not self._active:
+            self._layers, self._mask = layers, mask
+        else:
+            current = self._layers_or_cache()
+            width = max(self._mask.shape[1], length)
+            # Shorter rows are left-padded; the zero mask keeps the padded keys out of attention.
+            self._layers = [
+                (
+                    torch.cat([pad(key, (0, 0, width - key.shape[-2], 0)), pad(new_key, (0, 0, width - length, 0))]),
+                    torch.cat(
+                        [pad(value, (0, 0, width - value.shape[-2], 0)), pad(new_value, (0, 0, width - length, 0))]
+                    ),
+                )
+                for (key, value), (new_key, new_value) in zip(current, layers)
+            ]
+            self._mask = torch.cat([pad(self._mask, (width - self._mask.shape[1], 0)), pad(mask, (width - length, 0))])
+        self._cache = None
+        self._active.append(seq)
+
+    def _layers_or_cache(self) -> KVLayers:
+        if self._cache is not None:
+            self._layers = _cache_layers(self._cache)
+            self._cache = None
+        return self._layers
+
+    def _step(self) -> None:
+        torch = self._torch
+        device = self.model.device
+        batch = len(self._active)
+        if self._cache is None:
+            self._cache = _as_cache(self._layers)
+            self._layers = None
+        input_ids = torch.tensor([[seq.tokens[-1]] for seq in self._active], device=device)
+        # Each row continues from its own unpadded length, so rotary positions match a batch-of-one run.
+        position_ids = torch.tensor([[seq.position] for seq in self._active], device=device)
+        mask = torch.cat([self._mask, self._mask.new_ones((batch, 1))], dim=1)
+        with torch.inference_mode():
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=mask,
+                position_ids=position_ids,
+                past_key_values=self._cache,
+                use_cache=True,
+            )
+        self._cache = outputs.past_key_values
+        self._mask = mask
+        for seq, token in zip(self._active, outputs.logits[:, -1].argmax(dim=-1).tolist()):
+            seq.position += 1
+            self._append_token(seq, int(token))
+        with self._lock:
+            self.decode_steps += 1
+            self._histogram[batch] += 1
+
+    def _evict(self) -> None:
+        torch = self._torch
+        keep = [idx for idx, seq in enumerate(self._active) if not self._done(seq)]
+        if len(keep) == len(self._active):
+            return
+        for idx, seq in enumerate(self._active):
+            if idx not in keep:
+                self._finish(seq)
+        if not keep:
+            self._active, self._layers, self._cache, self._mask = [], None, None, None
+            return
+        index = torch.tensor(keep, device=self.model.device)
+        mask = self._mask.index_select(0, index)
+        # Columns that only held padding or finished rows are dropped so the next steps attend over less.
+        start = int(torch.nonzero(mask.any(dim=0))[0])
+        self._layers = [
+            (key.index_select(0, index)[:, :, start:], value.index_select(0, index)[:, :, start:])
+            for key, value in self._layers_or_cache()
+        ]
+        self._mask = mask[:, start:]
+        self._active = [self._active[idx] for idx in keep]
+
+    def _finish(self, seq: _Sequence) -> None:
+        if seq.future.cancelled():
+            self._record_cancelled(seq)
+            return
+        finished = time.perf_counter()
+        text = self.tokenizer.decode(seq.tokens, skip_special_tokens=True).strip()
+        if seq.streamer is not None:
+            seq.streamer.end()
+        elapsed = max(finished - seq.started_at, 1e-9)
+        result = GenerationResult(
+            text=text,
+            new_tokens=len(seq.tokens),
+            queue_ms=(seq.started_at - seq.submitted_at) * 1000.0,
+            ttft_ms=(seq.first_token_at - seq.submitted_at) * 1000.0,
+            total_ms=(finished - seq.submitted_at) * 1000.0,
+            tokens_per_s=len(seq.tokens) / elapsed,
+        )
+        with self._lock:
+            self.completed += 1
+            self.generated_tokens += result.new_tokens
+            self.total_queue_ms += result.queue_ms
+            self.total_ttft_ms += result.ttft_ms
+            self.total_tokens_per_s += result.tokens_per_s
+            self._recent.append(
+                {
+                    "new_tokens": result.new_tokens,
+                    "queue_ms": round(result.queue_ms, 3),
+                    "ttft_ms": round(result.ttft_ms, 3),
+                    "total_ms": round(result.total_ms, 3),
+                    "tokens_per_s": round(result.tokens_per_s, 3),
+                }
+            )
+        try:
+            seq.future.set_result(result)
+        except InvalidStateError:
+            # Cancelled between the check above and here; the result is simply dropped.
+            pass
+
+    def _fail(self, sequences: Sequence[_Sequence], exc: Exception) -> None:
+        with self._lock:
+            self.failed += len(sequences)
+        for seq in sequences:
+            if seq.streamer is not None:
+                seq.streamer.end()
+            if not seq.future.cancelled():
+                try:
+                    seq.future.set_exception(exc)
+                except InvalidStateError:
+                    pass
+
+    def _run(self) -> None:
+        while True:
+            for seq in self._admit():
+                try:
+                    layers = self._prefill(seq)
+                except Exception as exc:
+                    self._fail([seq], exc)
+                    continue
+                if self._done(seq):
+                    self._finish(seq)
+                    continue
+                try:
+                    self._join(seq, layers)
+                except Exception as exc:
+                    self._fail(self._active + [seq], exc)
+                    self._active, self._layers, self._cache, self._mask = [], None, None, None
+            if not self._active:
+                continue
+            try:
+                self._step()
+                self._evict()
+            except Exception as exc:
+                self._fail(self._active, exc)
+                self._active, self._layers, self._cache, self._mask = [], None, None, None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "requests": self.requests,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "tokens_saved": self.tokens_saved,
+                "active": len(self._active),
+                "queued": self._queue.qsize(),
+                "decode_steps": self.decode_steps,
+                "generated_tokens": self.generated_tokens,
+                "mean_batch_size": (
+                    round(sum(size * count for size, count in self._histogram.items()) / self.decode_steps, 3)
+                    if self.decode_steps
+                    else 0.0
+                ),
+                "mean_queue_ms": round(self.total_queue_ms / self.completed, 3) if self.completed else 0.0,
+                "mean_ttft_ms": round(self.total_ttft_ms / self.completed, 3) if self.completed else 0.0,
+                "mean_tokens_per_s": round(self.total_tokens_per_s / self.completed, 3) if self.completed else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._histogram.items())},
+                "recent": list(self._recent),
+            }
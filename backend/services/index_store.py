@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+import numpy as np
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+@contextmanager
+def atomic_output(path: Path, mode: str = "wb") -> Iterator[Any]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        encoding = None if "b" in mode else "utf-8"
+        with os.fdopen(fd, mode, encoding=encoding) as handle:
+            yield handle
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.remove(temp_name)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_save_npy(path: Path, array: np.ndarray) -> None:
+    with atomic_output(path) as handle:
+        np.save(handle, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def atomic_savez(path: Path, **arrays: np.ndarray) -> None:
+    with atomic_output(path) as handle:
+        np.savez(handle, **arrays)
+
+
+def atomic_write_json(path: Path, payload: Any) -> None:
+    with atomic_output(path, mode="w") as handle:
+        json.dump(payload, handle, ensure_ascii=False, indent=2)
+
+
+class InterProcessLock:
+    # Advisory lock on a file, shared by every process that opens the same path; the OS drops it if the holder dies.
+    def __init__(self, path: Path):
+        self.path = path
+        self._handle: Optional[IO[str]] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                handle.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.1)
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError:
+            handle.close()
+            if blocking:
+                raise
+            return False
+        self._handle = handle
+        return True
+
+    def release(self) -> None:
+        handle, self._handle = self._handle, None
+        if handle is None:
+            return
+        if os.name == "nt":
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        handle.close()
+
+
+def legacy_index_path(path: Path) -> Optional[Path]:
+    legacy = path.with_suffix(".npz")
+    if legacy != path and legacy.exists():
+        return legacy
+    return None
+
+
+def load_embeddings(path: Path) -> np.ndarray:
+    if path.suffix == ".npz":
+        # Compressed archives from older builds cannot be mapped; decompress once.
+        with np.load(path) as data:
+            return data["embeddings"].astype(np.float32)
+    embeddings = np.load(path, mmap_mode="r", allow_pickle=False)
+    if embeddings.dtype != np.float32 or embeddings.ndim != 2:
+        raise ValueError(f"Embedding store {path} must be a 2-D float32 array, got {embeddings.dtype} {embeddings.shape}")
+    return embeddings
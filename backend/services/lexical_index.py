@@ -0,0 +1,126 @@
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from backend.services.ann_index import top_k_indices
+from backend.services.index_store import atomic_savez
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Question words and function words carry almost no BM25 weight but have postings as long as the corpus.
+STOPWORDS = frozenset(
+    "a an and any are as at be by can do does for from has have how if in is it its may must of on or "
+    "shall should that the their there this to under upon was what when where which who whom whose why "
+    "will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        postings_offsets: np.ndarray,
+        postings_ids: np.ndarray,
+        postings_weights: np.ndarray,
+        doc_count: int,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.postings_offsets = postings_offsets
+        self.postings_ids = postings_ids
+        self.postings_weights = postings_weights
+        self.doc_count = doc_count
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        freqs: List[int] = []
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_id] = len(tokens)
+            for token, count in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc_id)
+                freqs.append(count)
+
+        doc_count = len(texts)
+        terms = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        postings_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        tf = np.asarray(freqs, dtype=np.float32)[order]
+        doc_freq = np.bincount(terms, minlength=len(vocabulary))
+        postings_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=postings_offsets[1:])
+
+        avg_length = float(doc_lengths.mean()) if doc_count else 0.0
+        length_norm = k1 * (1.0 - b + b * doc_lengths / max(avg_length, 1e-9))
+        idf = np.log(1.0 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        # Bake the full BM25 term weight in at build time so a query only gathers and adds.
+        postings_weights = (
+            np.repeat(idf, doc_freq) * tf * (k1 + 1.0) / (tf + length_norm[postings_ids])
+        ).astype(np.float32)
+        return cls(vocabulary, postings_offsets, postings_ids, postings_weights, doc_count)
+
+    def search(self, query: str, top_k: int, max_doc_fraction: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        max_doc_freq = max(1, int(self.doc_count * max_doc_fraction))
+        term_ids = set()
+        for token in tokenize(query):
+            term = self.vocabulary.get(token)
+            if term is None or token in STOPWORDS:
+                continue
+            # Terms in most documents have near-zero idf; skipping them keeps the gather proportional to rare terms.
+            if self.postings_offsets[term + 1] - self.postings_offsets[term] <= max_doc_freq:
+                term_ids.add(term)
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = np.concatenate(
+            [self.postings_ids[self.postings_offsets[t]:self.postings_offsets[t + 1]] for t in term_ids]
+        )
+        weights = np.concatenate(
+            [self.postings_weights[self.postings_offsets[t]:self.postings_offsets[t + 1]] for t in term_ids]
+        )
+        scores = np.bincount(ids, weights=weights, minlength=self.doc_count).astype(np.float32)
+        # Selecting among matched documents only; argpartition is slow over a mostly-zero array.
+        docs = np.flatnonzero(scores)
+        best = top_k_indices(scores[docs], top_k)
+        return docs[best].astype(np.int64), scores[docs[best]]
+
+    def save(self, path: Path) -> None:
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        atomic_savez(
+            path,
+            terms=np.asarray(terms, dtype=str),
+            postings_offsets=self.postings_offsets,
+            postings_ids=self.postings_ids,
+            postings_weights=self.postings_weights,
+            doc_count=np.asarray([self.doc_count], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            terms = data["terms"].tolist()
+            return cls(
+                {term: idx for idx, term in enumerate(terms)},
+                data["postings_offsets"],
+                data["postings_ids"],
+                data["postings_weights"],
+                int(data["doc_count"][0]),
+            )
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
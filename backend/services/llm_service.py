@@ -1,7 +1,13 @@
 import os
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from backend.services.generation_scheduler import GenerationScheduler
+from backend.services.prefix_cache import PrefixCache
 
 def _lazy_imports():
 	try:
@@ -27,19 +33,162 @@ else:
 	_BNB_AVAILABLE = False
 
 _LLM_ENABLED = os.getenv("LLM_ENABLED", "1") == "1"
-_LLM_THREAD_POOL = ThreadPoolExecutor(max_workers=2)
+_LLM_POOL_WORKERS = 2
+_LLM_THREAD_POOL = ThreadPoolExecutor(max_workers=_LLM_POOL_WORKERS)
+_LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+_LLM_PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "1") == "1"
+LLM_BACKENDS = ("transformers", "llama_cpp")
+LLM_QUANTIZATIONS = ("none", "int8")
+SYSTEM_PROMPT = "You are LegalEase, a legal assistant for Pakistan. Follow the user's language instruction exactly."
+# Fixed instruction preambles that prompts start with, keyed by the endpoint that sends them.
+_PROMPT_PREFIXES: Dict[str, str] = {}
+
+
+def _cancellation_criteria(cancel_event: threading.Event):
+	from transformers import StoppingCriteria, StoppingCriteriaList
+
+	class _StopWhenCancelled(StoppingCriteria):
+		def __call__(self, input_ids, scores, **kwargs):
+			return input_ids.new_full((input_ids.shape[0],), cancel_event.is_set(), dtype=bool)
+
+	return StoppingCriteriaList([_StopWhenCancelled()])
+
+
+class BaseLLMService(ABC):
+	backend = "base"
+
+	def __init__(self, model_id: str) -> None:
+		self.model_id = model_id
+		self.scheduler: Optional[GenerationScheduler] = None
+		self.prefix_cache: Optional[PrefixCache] = None
+		self._cancel_lock = threading.Lock()
+		self.cancelled_generations = 0
+		self.tokens_saved = 0
+
+	@abstractmethod
+	def count_tokens(self, text: str) -> int:
+		...
+
+	@abstractmethod
+	def generate_sync(
+		self,
+		prompt: str,
+		max_new_tokens: int = 256,
+		streamer=None,
+		cancel_event: Optional[threading.Event] = None,
+	) -> str:
+		...
+
+	@abstractmethod
+	def iter_text(
+		self,
+		prompt: str,
+		max_new_tokens: int,
+		cancel_event: Optional[threading.Event] = None,
+	) -> Iterator[str]:
+		...
+
+	def add_prompt_prefix(self, name: str, preamble: str) -> None:
+		pass
+
+	def info(self) -> dict:
+		return {"backend": self.backend, "model_id": self.model_id}
+
+	def _chat_messages(self, prompt: str) -> List[Dict[str, str]]:
+		return [
+			{"role": "system", "content": SYSTEM_PROMPT},
+			{"role": "user", "content": prompt},
+		]
+
+	def _record_cancelled(self, max_new_tokens: int, generated: int) -> None:
+		with self._cancel_lock:
+			self.cancelled_generations += 1
+			# Upper bound: the model might have stopped at EOS before using its whole budget.
+			self.tokens_saved += max(0, max_new_tokens - generated)
+
+	async def generate(self, prompt: str, max_new_tokens: int = 256, streamer=None) -> str:
+		loop = asyncio.get_running_loop()
+		cancel_event = threading.Event()
+		try:
+			return await loop.run_in_executor(
+				_LLM_THREAD_POOL,
+				self.generate_sync,
+				prompt,
+				max_new_tokens,
+				streamer,
+				cancel_event,
+			)
+		except asyncio.CancelledError:
+			# Timeouts and disconnects cancel this coroutine; the worker thread stops at its next token.
+			cancel_event.set()
+			raise
+
+	def _stream_into(
+		self,
+		prompt: str,
+		max_new_tokens: int,
+		chunks: "queue.Queue[Optional[str]]",
+		cancel_event: threading.Event,
+	) -> None:
+		try:
+			for text in self.iter_text(prompt, max_new_tokens, cancel_event):
+				chunks.put(text)
+		finally:
+			chunks.put(None)
+
+	async def stream(self, prompt: str, max_new_tokens: int = 256) -> AsyncIterator[str]:
+		loop = asyncio.get_running_loop()
+		chunks: "queue.Queue[Optional[str]]" = queue.Queue()
+		cancel_event = threading.Event()
+		generation = loop.run_in_executor(
+			_LLM_THREAD_POOL,
+			self._stream_into,
+			prompt,
+			max_new_tokens,
+			chunks,
+			cancel_event,
+		)
+		try:
+			while True:
+				text = await loop.run_in_executor(None, chunks.get)
+				if text is None:
+					break
+				if text:
+					yield text
+			await generation
+		finally:
+			if not generation.done():
+				cancel_event.set()
+				generation.cancel()
+
+	def cancellation_stats(self) -> dict:
+		with self._cancel_lock:
+			stats = {"cancelled_generations": self.cancelled_generations, "tokens_saved": self.tokens_saved}
+		if self.scheduler is not None:
+			scheduler_stats = self.scheduler.stats()
+			stats["cancelled_generations"] += scheduler_stats["cancelled"]
+			stats["tokens_saved"] += scheduler_stats["tokens_saved"]
+		return stats
 
 
-class LLMService:
+class LLMService(BaseLLMService):
+	backend = "transformers"
+
 	def __init__(
 		self,
 		model_id: str = "Qwen/Qwen2.5-1.5B-Instruct",
 		device_map: Optional[str] = None,
+		quantization: Optional[str] = None,
 	) -> None:
 		torch, AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig = _lazy_imports()
+		super().__init__(model_id)
 		self._torch = torch
-		self.model_id = model_id
 		self.device_map = device_map or os.getenv("LLM_DEVICE_MAP", "cpu")
+		self.quantization = (quantization or os.getenv("LLM_QUANTIZATION", "none")).lower()
+		if self.quantization not in LLM_QUANTIZATIONS:
+			raise ValueError(
+				f"Unsupported LLM quantization '{self.quantization}'. Use one of: {', '.join(LLM_QUANTIZATIONS)}"
+			)
 		self.use_4bit = os.getenv("LLM_4BIT", "0") == "1"
 		self.tokenizer = AutoTokenizer.from_pretrained(
 			self.model_id,
@@ -64,68 +213,311 @@ class LLMService:
 			)
 		elif self.use_4bit and not _BNB_AVAILABLE:
 			self.use_4bit = False
+		# Dynamic int8 quantises float32 Linear weights, so that path loads float32 on the CPU.
+		int8 = self.quantization == "int8" and quantization_config is None
+		if int8:
+			self.device_map = "cpu"
 		self.model = AutoModelForCausalLM.from_pretrained(
 			self.model_id,
-			dtype="auto",
+			dtype=torch.float32 if int8 else "auto",
 			device_map=self.device_map,
 			trust_remote_code=True,
 			quantization_config=quantization_config,
 		)
 		self.model.eval()
+		if int8:
+			torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+		elif self.quantization == "int8":
+			self.quantization = "none"
+		# With LLM_BATCH_SIZE > 1 concurrent prompts share decode steps instead of queueing on the thread pool.
+		if _LLM_BATCH_SIZE > 1:
+			self.scheduler = GenerationScheduler(self.model, self.tokenizer, torch, max_batch_size=_LLM_BATCH_SIZE)
+		if _LLM_PREFIX_CACHE:
+			self.prefix_cache = PrefixCache(self.model, torch)
+			self.add_prompt_prefix("system", "")
+			for name, preamble in list(_PROMPT_PREFIXES.items()):
+				self.add_prompt_prefix(name, preamble)
+
+	def count_tokens(self, text: str) -> int:
+		return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+	def info(self) -> dict:
+		return {
+			**super().info(),
+			"device": str(self.model.device),
+			"device_map": self.device_map,
+			"use_4bit": self.use_4bit,
+			"quantization": self.quantization,
+			"batch_size": _LLM_BATCH_SIZE,
+		}
 
-	def generate_sync(self, prompt: str, max_new_tokens: int = 256) -> str:
+	def add_prompt_prefix(self, name: str, preamble: str) -> None:
+		marker = "\x00prompt\x00"
+		rendered = self.tokenizer.apply_chat_template(
+			self._chat_messages(preamble + marker),
+			add_generation_prompt=True,
+			tokenize=False,
+		)
+		prefix_text = rendered[:rendered.index(marker)]
+		self.prefix_cache.add(name, self.tokenizer.encode(prefix_text, add_special_tokens=False))
+
+	def _prefix_cache_for(self, input_ids):
+		if self.prefix_cache is None:
+			return None
+		cache, _ = self.prefix_cache.match(input_ids)
+		return cache
+
+	def _chat_inputs(self, prompt: str):
+		messages = self._chat_messages(prompt)
+		input_ids = self.tokenizer.apply_chat_template(
+			messages,
+			add_generation_prompt=True,
+			return_tensors="pt",
+		)
+		input_ids = input_ids.to(self.model.device)
+		attention_mask = input_ids.ne(self.tokenizer.pad_token_id)
+		return input_ids, attention_mask
+
+	def _scheduler_inputs(self, prompt: str):
+		# Tokenising and copying the prefix KV cache take milliseconds, so async callers run this in a thread.
+		input_ids, _ = self._chat_inputs(prompt)
+		return input_ids, self._prefix_cache_for(input_ids)
+
+	def generate_sync(
+		self,
+		prompt: str,
+		max_new_tokens: int = 256,
+		streamer=None,
+		cancel_event: Optional[threading.Event] = None,
+	) -> str:
+		if self.scheduler is not None:
+			input_ids, past_key_values = self._scheduler_inputs(prompt)
+			return self.scheduler.submit(input_ids, max_new_tokens, streamer, past_key_values).result().text
 		torch = self._torch
-		messages = [
-			{
-				"role": "system",
-				"content": "You are LegalEase, a legal assistant for Pakistan. Follow the user's language instruction exactly.",
-			},
-			{"role": "user", "content": prompt},
-		]
 		with torch.inference_mode():
-			input_ids = self.tokenizer.apply_chat_template(
-				messages,
-				add_generation_prompt=True,
-				return_tensors="pt",
-			)
-			input_ids = input_ids.to(self.model.device)
-			attention_mask = input_ids.ne(self.tokenizer.pad_token_id)
-
+			input_ids, attention_mask = self._chat_inputs(prompt)
+			# Only the prompt tokens after a cached system/instruction prefix are prefilled.
 			output_ids = self.model.generate(
 				input_ids,
 				attention_mask=attention_mask,
+				past_key_values=self._prefix_cache_for(input_ids),
 				max_new_tokens=max_new_tokens,
 				do_sample=False,
 				pad_token_id=self.tokenizer.pad_token_id,
+				streamer=streamer,
+				# Checked after every token, so an abandoned request stops within one decode step.
+				stopping_criteria=_cancellation_criteria(cancel_event) if cancel_event is not None else None,
 			)
+			if cancel_event is not None and cancel_event.is_set():
+				self._record_cancelled(max_new_tokens, output_ids.shape[-1] - input_ids.shape[-1])
 			output_text = self.tokenizer.decode(
 				output_ids[0][input_ids.shape[-1]:],
 				skip_special_tokens=True,
 			)
 		return output_text.strip()
 
-	async def generate(self, prompt: str, max_new_tokens: int = 256) -> str:
+	async def generate(self, prompt: str, max_new_tokens: int = 256, streamer=None) -> str:
+		if self.scheduler is not None:
+			loop = asyncio.get_running_loop()
+			input_ids, past_key_values = await loop.run_in_executor(None, self._scheduler_inputs, prompt)
+			result = await asyncio.wrap_future(self.scheduler.submit(input_ids, max_new_tokens, streamer, past_key_values))
+			return result.text
+		return await super().generate(prompt, max_new_tokens, streamer)
+
+	def _generate_into(self, prompt: str, max_new_tokens: int, streamer, cancel_event: threading.Event) -> str:
+		try:
+			return self.generate_sync(prompt, max_new_tokens, streamer=streamer, cancel_event=cancel_event)
+		except Exception:
+			# Wake the reader; the error itself surfaces when the generation future is awaited.
+			streamer.end()
+			raise
+
+	async def stream(self, prompt: str, max_new_tokens: int = 256) -> AsyncIterator[str]:
+		from transformers import TextIteratorStreamer
+
 		loop = asyncio.get_running_loop()
-		return await loop.run_in_executor(
-			_LLM_THREAD_POOL,
-			self.generate_sync,
-			prompt,
-			max_new_tokens,
-		)
+		streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+		cancel_event = threading.Event()
+		if self.scheduler is not None:
+			input_ids, past_key_values = await loop.run_in_executor(None, self._scheduler_inputs, prompt)
+			generation = asyncio.wrap_future(self.scheduler.submit(input_ids, max_new_tokens, streamer, past_key_values))
+		else:
+			generation = loop.run_in_executor(
+				_LLM_THREAD_POOL,
+				self._generate_into,
+				prompt,
+				max_new_tokens,
+				streamer,
+				cancel_event,
+			)
+		chunks = iter(streamer)
+		try:
+			while True:
+				# The streamer blocks on a queue, so the wait for each chunk happens off the event loop.
+				text = await loop.run_in_executor(None, next, chunks, None)
+				if text is None:
+					break
+				if text:
+					yield text
+			await generation
+		finally:
+			# Reached early when the consumer stops reading, e.g. the SSE client went away.
+			if not generation.done():
+				cancel_event.set()
+				generation.cancel()
+
+	def iter_text(
+		self,
+		prompt: str,
+		max_new_tokens: int,
+		cancel_event: Optional[threading.Event] = None,
+	) -> Iterator[str]:
+		from transformers import TextIteratorStreamer
+
+		streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+		cancel_event = cancel_event or threading.Event()
+		if self.scheduler is not None:
+			input_ids, past_key_values = self._scheduler_inputs(prompt)
+			generation = self.scheduler.submit(input_ids, max_new_tokens, streamer, past_key_values)
+		else:
+			# A thread of its own: callers may already be running on the LLM pool.
+			generation = Future()
+			generation.set_running_or_notify_cancel()
+
+			def run() -> None:
+				try:
+					generation.set_result(self._generate_into(prompt, max_new_tokens, streamer, cancel_event))
+				except BaseException as exc:
+					generation.set_exception(exc)
+
+			threading.Thread(target=run, name="llm-iter-text", daemon=True).start()
+		try:
+			for text in streamer:
+				if text:
+					yield text
+			generation.result()
+		finally:
+			if not generation.done():
+				cancel_event.set()
+				generation.cancel()
 
 
-_llm_service: Optional[LLMService] = None
+class LlamaCppLLMService(BaseLLMService):
+	backend = "llama_cpp"
+
+	def __init__(
+		self,
+		model_id: str = "Qwen/Qwen2.5-1.5B-Instruct",
+		gguf_path: Optional[str] = None,
+		gguf_repo: Optional[str] = None,
+		gguf_file: Optional[str] = None,
+	) -> None:
+		try:
+			from llama_cpp import Llama, LlamaRAMCache
+		except Exception as exc:  # pragma: no cover
+			raise RuntimeError(
+				"The llama.cpp backend needs llama-cpp-python. Install it or set LLM_BACKEND=transformers."
+			) from exc
+		super().__init__(model_id)
+		self.threads = int(os.getenv("LLM_THREADS", "0")) or os.cpu_count() or 1
+		self.context_tokens = int(os.getenv("LLM_CONTEXT_TOKENS", "4096"))
+		options = {"n_ctx": self.context_tokens, "n_threads": self.threads, "verbose": False}
+		gguf_path = gguf_path or os.getenv("LLM_GGUF_PATH")
+		if gguf_path:
+			self.model = Llama(model_path=gguf_path, **options)
+			self.gguf = gguf_path
+		else:
+			gguf_repo = gguf_repo or os.getenv("LLM_GGUF_REPO", "Qwen/Qwen2.5-1.5B-Instruct-GGUF")
+			gguf_file = gguf_file or os.getenv("LLM_GGUF_FILE", "qwen2.5-1.5b-instruct-q4_k_m.gguf")
+			self.model = Llama.from_pretrained(repo_id=gguf_repo, filename=gguf_file, **options)
+			self.gguf = f"{gguf_repo}/{gguf_file}"
+		if _LLM_PREFIX_CACHE:
+			# llama.cpp reuses the KV state of the longest matching earlier prompt, which covers the fixed prefixes.
+			self.model.set_cache(LlamaRAMCache())
+		# One llama.cpp context decodes one sequence at a time; parallelism comes from its own threads.
+		self._model_lock = threading.Lock()
+
+	def count_tokens(self, text: str) -> int:
+		return len(self.model.tokenize(text.encode("utf-8"), add_bos=False, special=False))
+
+	def info(self) -> dict:
+		return {
+			**super().info(),
+			"gguf": self.gguf,
+			"threads": self.threads,
+			"context_tokens": self.context_tokens,
+		}
+
+	def iter_text(
+		self,
+		prompt: str,
+		max_new_tokens: int,
+		cancel_event: Optional[threading.Event] = None,
+	) -> Iterator[str]:
+		with self._model_lock:
+			chunks = self.model.create_chat_completion(
+				messages=self._chat_messages(prompt),
+				max_tokens=max_new_tokens,
+				temperature=0.0,
+				stream=True,
+			)
+			generated = 0
+			try:
+				for chunk in chunks:
+					if cancel_event is not None and cancel_event.is_set():
+						self._record_cancelled(max_new_tokens, generated)
+						break
+					generated += 1
+					text = chunk["choices"][0]["delta"].get("content")
+					if text:
+						yield text
+			finally:
+				chunks.close()
+
+	def generate_sync(
+		self,
+		prompt: str,
+		max_new_tokens: int = 256,
+		streamer=None,
+		cancel_event: Optional[threading.Event] = None,
+	) -> str:
+		if streamer is not None:
+			raise ValueError("Token streamers are transformers-specific; use stream() with the llama.cpp backend.")
+		return "".join(self.iter_text(prompt, max_new_tokens, cancel_event)).strip()
 
 
-def get_llm_service() -> LLMService:
+def create_llm_service(backend: Optional[str] = None, **kwargs) -> BaseLLMService:
+	backend = (backend or os.getenv("LLM_BACKEND", "transformers")).lower()
+	if backend == "transformers":
+		return LLMService(**kwargs)
+	if backend == "llama_cpp":
+		return LlamaCppLLMService(**kwargs)
+	raise ValueError(f"Unsupported LLM backend '{backend}'. Use one of: {', '.join(LLM_BACKENDS)}")
+
+
+_llm_service: Optional[BaseLLMService] = None
+
+
+def get_llm_service() -> BaseLLMService:
 	if not _LLM_ENABLED:
 		raise RuntimeError("LLM is disabled via LLM_ENABLED=0")
 	global _llm_service
 	if _llm_service is None:
-		_llm_service = LLMService()
+		_llm_service = create_llm_service()
 	return _llm_service
 
 
+def llm_generation_capacity() -> int:
+	# How many generations the configured backend advances at once: one batch, or one per pool thread.
+	backend = os.getenv("LLM_BACKEND", "transformers").lower()
+	if backend == "llama_cpp":
+		# Every llama.cpp call holds the model lock, so extra pool threads only queue behind it.
+		return 1
+	if _LLM_BATCH_SIZE > 1:
+		return _LLM_BATCH_SIZE
+	return _LLM_POOL_WORKERS
+
+
 def is_llm_ready() -> bool:
 	return _llm_service is not None
 
@@ -140,11 +532,38 @@ def get_llm_info() -> dict:
 	if _llm_service is None:
 		return {"status": "loading"}
 
-	device = str(_llm_service.model.device)
-	return {
-		"status": "loaded",
-		"model_id": _llm_service.model_id,
-		"device": device,
-		"device_map": _llm_service.device_map,
-		"use_4bit": _llm_service.use_4bit,
-	}
+	return {"status": "loaded", **_llm_service.info()}
+
+
+def register_prompt_prefix(name: str, preamble: str) -> None:
+	_PROMPT_PREFIXES[name] = preamble
+	if _llm_service is not None and _llm_service.prefix_cache is not None:
+		_llm_service.add_prompt_prefix(name, preamble)
+
+
+def get_llm_prefix_cache_stats() -> dict:
+	if not _LLM_ENABLED:
+		return {"status": "disabled"}
+	if _llm_service is None:
+		return {"status": "loading"}
+	if _llm_service.prefix_cache is None:
+		return {"status": "off"}
+	return {"status": "on", **_llm_service.prefix_cache.stats()}
+
+
+def get_llm_cancellation_stats() -> dict:
+	if not _LLM_ENABLED:
+		return {"status": "disabled"}
+	if _llm_service is None:
+		return {"status": "loading"}
+	return {"status": "loaded", **_llm_service.cancellation_stats()}
+
+
+def get_llm_batching_stats() -> dict:
+	if not _LLM_ENABLED:
+		return {"status": "disabled"}
+	if _llm_service is None:
+		return {"status": "loading"}
+	if _llm_service.scheduler is None:
+		return {"status": "off", "batch_size": _LLM_BATCH_SIZE}
+	return {"status": "on", **_llm_service.scheduler.stats()}
@@ -0,0 +1,152 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.services.ann_index import top_k_indices
+from backend.services.index_store import atomic_write_json
+
+PARTITION_FIELDS = ("domain", "law_name")
+
+Range = Tuple[int, int]
+
+
+def partition_sort_key(record: Mapping[str, Any]) -> Tuple[str, str]:
+    return (str(record.get("domain") or ""), str(record.get("law_name") or ""))
+
+
+def _value_ranges(values: Sequence[str]) -> Dict[str, List[Range]]:
+    ranges: Dict[str, List[Range]] = {}
+    start = 0
+    for idx in range(1, len(values) + 1):
+        if idx == len(values) or values[idx] != values[start]:
+            ranges.setdefault(values[start], []).append((start, idx))
+            start = idx
+    return ranges
+
+
+def _merge_ranges(ranges: Sequence[Range]) -> List[Range]:
+    merged: List[Range] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _intersect_ranges(left: Sequence[Range], right: Sequence[Range]) -> List[Range]:
+    result: List[Range] = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        end = min(left[i][1], right[j][1])
+        if start < end:
+            result.append((start, end))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def scan_ranges(
+    embeddings: np.ndarray,
+    query: np.ndarray,
+    ranges: Sequence[Range],
+    top_k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    if not ranges:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    # Contiguous slices of the (memory-mapped) matrix are views, so a filtered scan never copies rows.
+    ids = np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges])
+    scores = np.concatenate([np.dot(embeddings[start:end], query) for start, end in ranges])
+    best = top_k_indices(scores, top_k)
+    return ids[best], scores[best]
+
+
+def in_ranges(ids: np.ndarray, ranges: Sequence[Range]) -> np.ndarray:
+    mask = np.zeros(len(ids), dtype=bool)
+    for start, end in ranges:
+        mask |= (ids >= start) & (ids < end)
+    return mask
+
+
+class PartitionIndex:
+    def __init__(
+        self,
+        ranges: Dict[str, Dict[str, List[Range]]],
+        domain_centroids: Dict[str, np.ndarray],
+    ) -> None:
+        self.ranges = ranges
+        self.domain_centroids = domain_centroids
+        self._lookup = {
+            field: {value.lower(): value for value in values}
+            for field, values in ranges.items()
+        }
+
+    @classmethod
+    def build(cls, metadata: Sequence[Mapping[str, Any]], embeddings: np.ndarray) -> "PartitionIndex":
+        ranges = {
+            field: _value_ranges([str(item.get(field) or "") for item in metadata])
+            for field in PARTITION_FIELDS
+        }
+        domain_centroids: Dict[str, np.ndarray] = {}
+        for domain, domain_ranges in ranges["domain"].items():
+            total = np.zeros(embeddings.shape[1], dtype=np.float32)
+            for start, end in domain_ranges:
+                total += np.asarray(embeddings[start:end], dtype=np.float32).sum(axis=0)
+            domain_centroids[domain] = total / max(float(np.linalg.norm(total)), 1e-12)
+        return cls(ranges, domain_centroids)
+
+    def select(self, filters: Optional[Mapping[str, Sequence[str]]]) -> Optional[List[Range]]:
+        if not filters:
+            return None
+        selected: Optional[List[Range]] = None
+        for field, values in filters.items():
+            if not values:
+                continue
+            if field not in self._lookup:
+                raise ValueError(f"Unsupported filter '{field}'. Use one of: {', '.join(PARTITION_FIELDS)}")
+            field_ranges: List[Range] = []
+            for value in values:
+                key = self._lookup[field].get(str(value).strip().lower())
+                if key is not None:
+                    field_ranges.extend(self.ranges[field][key])
+            field_ranges = _merge_ranges(field_ranges)
+            selected = field_ranges if selected is None else _intersect_ranges(selected, field_ranges)
+        return selected
+
+    def route(self, query: np.ndarray, n_domains: int) -> Optional[List[Range]]:
+        domains = list(self.domain_centroids)
+        if n_domains <= 0 or n_domains >= len(domains):
+            return None
+        centroids = np.stack([self.domain_centroids[domain] for domain in domains])
+        best = top_k_indices(np.dot(centroids, query), n_domains)
+        return _merge_ranges([r for idx in best for r in self.ranges["domain"][domains[idx]]])
+
+    def save(self, path: Path) -> None:
+        atomic_write_json(
+            path,
+            {
+                "ranges": {
+                    field: {value: [list(r) for r in value_ranges] for value, value_ranges in values.items()}
+                    for field, values in self.ranges.items()
+                },
+                "domain_centroids": {domain: vector.tolist() for domain, vector in self.domain_centroids.items()},
+            },
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "PartitionIndex":
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        ranges = {
+            field: {value: [(int(r[0]), int(r[1])) for r in value_ranges] for value, value_ranges in values.items()}
+            for field, values in payload.get("ranges", {}).items()
+        }
+        domain_centroids = {
+            domain: np.asarray(vector, dtype=np.float32)
+            for domain, vector in payload.get("domain_centroids", {}).items()
+        }
+        return cls(ranges, domain_centroids)
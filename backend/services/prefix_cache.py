@@ -0,0 +1,104 @@
+import copy
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class _Prefix:
+    name: str
+    token_ids: List[int]
+    cache: Any
+    build_ms: float
+    hits: int = 0
+    reused_tokens: int = 0
+    prompt_tokens: int = 0
+
+
+def _common_prefix(left: List[int], right: List[int]) -> int:
+    length = 0
+    for a, b in zip(left, right):
+        if a != b:
+            break
+        length += 1
+    return length
+
+
+class PrefixCache:
+    def __init__(self, model: Any, torch_module: Any, min_match: float = 0.5) -> None:
+        self.model = model
+        self._torch = torch_module
+        self.min_match = min_match
+        self._prefixes: Dict[str, _Prefix] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.misses = 0
+        self.miss_prompt_tokens = 0
+
+    def add(self, name: str, token_ids: List[int]) -> None:
+        torch = self._torch
+        started = time.perf_counter()
+        input_ids = torch.tensor([token_ids], device=self.model.device)
+        with torch.inference_mode():
+            outputs = self.model(input_ids=input_ids, attention_mask=torch.ones_like(input_ids), use_cache=True)
+        entry = _Prefix(
+            name=name,
+            token_ids=list(token_ids),
+            cache=outputs.past_key_values,
+            build_ms=(time.perf_counter() - started) * 1000.0,
+        )
+        with self._lock:
+            self._prefixes[name] = entry
+
+    def match(self, input_ids: Any) -> Tuple[Optional[Any], int]:
+        tokens = input_ids[0].tolist()
+        with self._lock:
+            prefixes = list(self._prefixes.values())
+        best: Optional[_Prefix] = None
+        best_length = 0
+        for entry in prefixes:
+            length = _common_prefix(entry.token_ids, tokens)
+            # The last prefix token can merge with the text that follows it, so a near-full match still counts.
+            if length >= max(1, int(len(entry.token_ids) * self.min_match)) and length > best_length:
+                best, best_length = entry, length
+        # The model needs at least one uncached prompt token to produce the first logits.
+        best_length = min(best_length, len(tokens) - 1)
+        with self._lock:
+            self.lookups += 1
+            if best is None or best_length <= 0:
+                self.misses += 1
+                self.miss_prompt_tokens += len(tokens)
+                return None, 0
+            best.hits += 1
+            best.reused_tokens += best_length
+            best.prompt_tokens += len(tokens)
+        # Generation appends to the cache in place, so every request works on its own copy.
+        cache = copy.deepcopy(best.cache)
+        if best_length < len(best.token_ids):
+            cache.crop(best_length)
+        return cache, best_length
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            prefixes = {}
+            for entry in self._prefixes.values():
+                ms_per_token = entry.build_ms / len(entry.token_ids) if entry.token_ids else 0.0
+                prefixes[entry.name] = {
+                    "prefix_tokens": len(entry.token_ids),
+                    "build_ms": round(entry.build_ms, 3),
+                    "hits": entry.hits,
+                    "reused_tokens": entry.reused_tokens,
+                    "prompt_tokens": entry.prompt_tokens,
+                    "reused_fraction": (
+                        round(entry.reused_tokens / entry.prompt_tokens, 3) if entry.prompt_tokens else 0.0
+                    ),
+                    # Prefill cost of the skipped tokens, priced at the prefix's own build rate.
+                    "estimated_prefill_ms_saved": round(entry.reused_tokens * ms_per_token, 3),
+                }
+            return {
+                "lookups": self.lookups,
+                "misses": self.misses,
+                "miss_prompt_tokens": self.miss_prompt_tokens,
+                "prefixes": prefixes,
+            }
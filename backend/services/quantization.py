@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from backend.services.ann_index import exact_search, top_k_indices
+from backend.services.index_store import atomic_save_npy
+
+STORAGE_MODES = ("float32", "float16", "int8")
+# float16 only halves resident memory: numpy widens half floats slowly, so its scan is slower than float32.
+MEMORY_ONLY_MODES = ("float16",)
+_SCAN_BUFFER_BYTES = 512 * 1024
+
+
+def compact_paths(index_path: Path, mode: str) -> Tuple[Path, Path]:
+    codes = index_path.with_name(f"{index_path.stem}_{mode}.npy")
+    scales = index_path.with_name(f"{index_path.stem}_{mode}_scales.npy")
+    return codes, scales
+
+
+class CompactEmbeddings:
+    def __init__(self, mode: str, codes: np.ndarray, scales: Optional[np.ndarray] = None) -> None:
+        if mode not in ("float16", "int8"):
+            raise ValueError(f"Unsupported compact storage mode '{mode}'.")
+        self.mode = mode
+        self.codes = codes
+        self.scales = scales
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray, mode: str) -> "CompactEmbeddings":
+        if mode == "float16":
+            return cls(mode, np.asarray(embeddings, dtype=np.float16))
+        # Symmetric per-vector scalar quantisation keeps each row's direction intact.
+        max_abs = np.max(np.abs(embeddings), axis=1)
+        scales = (np.maximum(max_abs, 1e-12) / 127.0).astype(np.float32)
+        codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(mode, codes, scales)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        # numpy has no int8/float16 GEMV, so blocks are widened into one cache-sized float32 buffer that
+        # BLAS reads back from cache; allocating a fresh widened block per step costs more than the scan.
+        query = np.asarray(query, dtype=np.float32)
+        total, dim = self.codes.shape
+        block_size = max(64, _SCAN_BUFFER_BYTES // (4 * max(dim, 1)))
+        buffer = np.empty((min(block_size, total), dim), dtype=np.float32)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, block_size):
+            block = self.codes[start:start + block_size]
+            widened = buffer[:len(block)]
+            np.copyto(widened, block, casting="unsafe")
+            np.dot(widened, query, out=scores[start:start + len(block)])
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def save(self, index_path: Path) -> None:
+        codes_path, scales_path = compact_paths(index_path, self.mode)
+        atomic_save_npy(codes_path, self.codes)
+        if self.scales is not None:
+            atomic_save_npy(scales_path, self.scales)
+
+    @classmethod
+    def load(cls, index_path: Path, mode: str) -> Optional["CompactEmbeddings"]:
+        codes_path, scales_path = compact_paths(index_path, mode)
+        if not codes_path.exists():
+            return None
+        codes = np.load(codes_path, mmap_mode="r", allow_pickle=False)
+        scales = None
+        if mode == "int8":
+            if not scales_path.exists():
+                return None
+            scales = np.load(scales_path, allow_pickle=False).astype(np.float32)
+        return cls(mode, codes, scales)
+
+
+def rescored_search(
+    compact: CompactEmbeddings,
+    embeddings: np.ndarray,
+    query: np.ndarray,
+    top_k: int,
+    rescore_factor: int = 4,
+) -> Tuple[np.ndarray, np.ndarray]:
+    total = len(compact.codes)
+    shortlist_size = min(total, max(top_k * rescore_factor, 20))
+    if shortlist_size >= total:
+        return exact_search(embeddings, query, top_k)
+    shortlist = top_k_indices(compact.approximate_scores(query), shortlist_size)
+    shortlist.sort()
+    scores = np.dot(np.asarray(embeddings[shortlist], dtype=np.float32), query)
+    best = top_k_indices(scores, top_k)
+    return shortlist[best], scores[best]
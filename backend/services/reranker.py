@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_id: str, batch_size: int = 4) -> None:
+        self.model_id = model_id
+        self.batch_size = max(1, batch_size)
+        self.model = None
+        self._model_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.candidates_scored = 0
+        self.candidates_skipped = 0
+        self.budget_exhausted = 0
+        self.scoring_ms = 0.0
+        # Running estimate used to decide whether the next batch still fits in the budget.
+        self.ms_per_candidate: Optional[float] = None
+
+    def load(self) -> None:
+        with self._model_lock:
+            if self.model is None:
+                from sentence_transformers import CrossEncoder
+
+                logger = logging.getLogger("uvicorn.error")
+                started = time.time()
+                self.model = CrossEncoder(self.model_id, device="cpu")
+                logger.info("Rerank model %s loaded in %.1fs.", self.model_id, time.time() - started)
+
+    def _score(self, query: str, passages: Sequence[str]) -> List[float]:
+        scores = self.model.predict([(query, passage) for passage in passages], batch_size=len(passages))
+        return [float(score) for score in scores]
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        top_n: int,
+        budget_ms: float,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        self.load()
+        started = time.perf_counter()
+        scored: List[Tuple[float, int]] = []
+        exhausted = False
+        position = 0
+        while position < len(candidates):
+            batch = candidates[position:position + self.batch_size]
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            estimate = self.ms_per_candidate
+            if scored and estimate is not None and elapsed_ms + estimate * len(batch) > budget_ms:
+                exhausted = True
+                break
+            batch_started = time.perf_counter()
+            scores = self._score(query, [item.get("text") or "" for item in batch])
+            per_candidate = (time.perf_counter() - batch_started) * 1000.0 / len(batch)
+            with self._stats_lock:
+                self.ms_per_candidate = (
+                    per_candidate if self.ms_per_candidate is None else 0.8 * self.ms_per_candidate + 0.2 * per_candidate
+                )
+            scored.extend((score, position + offset) for offset, score in enumerate(scores))
+            position += len(batch)
+
+        # Scored candidates are the head of the retrieval order; anything the budget did not reach keeps that order.
+        ranked = sorted(scored, key=lambda pair: pair[0], reverse=True)
+        results: List[Dict[str, Any]] = []
+        for score, idx in ranked:
+            item = dict(candidates[idx])
+            item["rerank_score"] = score
+            results.append(item)
+        results.extend(dict(item, rerank_score=None) for item in candidates[position:])
+        total_ms = (time.perf_counter() - started) * 1000.0
+
+        with self._stats_lock:
+            self.requests += 1
+            self.candidates_scored += len(scored)
+            self.candidates_skipped += len(candidates) - len(scored)
+            self.budget_exhausted += int(exhausted)
+            self.scoring_ms += total_ms
+        report = {
+            "candidates": len(candidates),
+            "scored": len(scored),
+            "budget_ms": budget_ms,
+            "elapsed_ms": round(total_ms, 3),
+            "ms_per_candidate": round(total_ms / len(scored), 3) if scored else None,
+            "budget_exhausted": exhausted,
+        }
+        return results[:top_n], report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "model": self.model_id,
+                "loaded": self.model is not None,
+                "requests": self.requests,
+                "candidates_scored": self.candidates_scored,
+                "candidates_skipped": self.candidates_skipped,
+                "budget_exhausted": self.budget_exhausted,
+                "mean_ms_per_candidate": (
+                    round(self.scoring_ms / self.candidates_scored, 3) if self.candidates_scored else None
+                ),
+                "recent_ms_per_candidate": (
+                    round(self.ms_per_candidate, 3) if self.ms_per_candidate is not None else None
+                ),
+            }
@@ -1,13 +1,180 @@
+import hashlib
 import json
 import os
 import logging
+import shutil
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import numpy as np
+import psutil
 from sentence_transformers import SentenceTransformer
 
+from backend.services.ann_index import IVFIndex, exact_search, measure_latency_ms, measure_recall
+from backend.services.cache import TTLCache
+from backend.services.embedding_backends import EMBEDDING_BACKENDS, load_embedding_model, verify_backend
+from backend.services.embedding_batcher import EmbeddingBatcher
+from backend.services.index_store import (
+    InterProcessLock,
+    atomic_output,
+    atomic_write_json,
+    legacy_index_path,
+    load_embeddings,
+)
+from backend.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from backend.services.partitions import PartitionIndex, Range, in_ranges, partition_sort_key, scan_ranges
+from backend.services.quantization import MEMORY_ONLY_MODES, STORAGE_MODES, CompactEmbeddings, rescored_search
+from backend.services.reranker import CrossEncoderReranker
+from backend.services.section_index import SectionIndex
+from backend.utils.jsonl import iter_records
+from backend.utils.manifest import IngestionManifest, file_sha256, manifest_path
+
+SEARCH_MODES = ("exact", "ivf", "hybrid")
+
+_BUILD_POOL = ThreadPoolExecutor(max_workers=1)
+
+
+@dataclass
+class IndexPaths:
+    embeddings: Path
+    metadata: Path
+    ann_index: Path
+
+    @classmethod
+    def in_directory(cls, directory: Path) -> "IndexPaths":
+        return cls(
+            embeddings=directory / "rag_index.npy",
+            metadata=directory / "rag_metadata.json",
+            ann_index=directory / "rag_index_ivf.npz",
+        )
+
+    def _sibling(self, suffix: str) -> Path:
+        return self.embeddings.with_name(f"{self.embeddings.stem}{suffix}")
+
+    @property
+    def lexical_index(self) -> Path:
+        return self._sibling("_bm25.npz")
+
+    @property
+    def partitions(self) -> Path:
+        return self._sibling("_partitions.json")
+
+    @property
+    def manifest(self) -> Path:
+        return self._sibling("_manifest.json")
+
+    @property
+    def content_hashes(self) -> Path:
+        return self._sibling("_content_hashes.json")
+
+    def embedding_store(self) -> Optional[Path]:
+        if self.embeddings.exists():
+            return self.embeddings
+        return legacy_index_path(self.embeddings)
+
+    def exists(self) -> bool:
+        return self.embedding_store() is not None and self.metadata.exists()
+
+
+@dataclass
+class IndexSnapshot:
+    version: int
+    embeddings: np.ndarray
+    metadata: List[Dict[str, Any]]
+    ann_index: Optional[IVFIndex] = None
+    compact_embeddings: Optional[CompactEmbeddings] = None
+    lexical_index: Optional[BM25Index] = None
+    partitions: Optional[PartitionIndex] = None
+    sections: Optional[SectionIndex] = None
+    source: str = ""
+
+
+@dataclass
+class IndexBuildJob:
+    job_id: str
+    full_rebuild: bool
+    status: str = "queued"
+    stage: str = "queued"
+    progress: float = 0.0
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    finished_at: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Job state is mirrored to disk so every API worker can answer status polls, not just the one building.
+    path: Optional[Path] = field(default=None, repr=False, compare=False)
+    pid: int = field(default_factory=os.getpid, repr=False, compare=False)
+
+    def update(self, stage: str, progress: float) -> None:
+        self.stage = stage
+        self.progress = round(min(max(progress, 0.0), 1.0), 4)
+        self.save()
+
+    def save(self) -> None:
+        if self.path is not None:
+            atomic_write_json(self.path, {**self.to_dict(), "pid": self.pid})
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any], path: Optional[Path] = None) -> "IndexBuildJob":
+        return cls(
+            job_id=payload["job_id"],
+            full_rebuild=bool(payload.get("full_rebuild")),
+            status=payload.get("status", "queued"),
+            stage=payload.get("stage", "queued"),
+            progress=float(payload.get("progress", 0.0)),
+            created_at=payload.get("created_at") or datetime.now(timezone.utc).isoformat(),
+            finished_at=payload.get("finished_at"),
+            result=payload.get("result"),
+            error=payload.get("error"),
+            path=path,
+            pid=int(payload.get("pid") or 0),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "full_rebuild": self.full_rebuild,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join((query or "").split()).casefold()
+
+
+def _minimal_record(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "chunk_id": item.get("chunk_id"),
+        "law_name": item.get("law_name"),
+        "domain": item.get("domain"),
+        "jurisdiction": item.get("jurisdiction"),
+        "section_id": item.get("section_id"),
+        "section_title": item.get("section_title"),
+        "chunk_index": item.get("chunk_index"),
+        "text": item.get("text") or "",
+    }
+
+
+def _read_json(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
 
 class RetrievalService:
     def __init__(
@@ -16,51 +183,225 @@ class RetrievalService:
         index_path: Optional[Path] = None,
         metadata_path: Optional[Path] = None,
         embedding_model_id: Optional[str] = None,
+        ann_index_path: Optional[Path] = None,
+        search_mode: Optional[str] = None,
+        storage_mode: Optional[str] = None,
+        index_dir: Optional[Path] = None,
     ) -> None:
         base_dir = Path(__file__).resolve().parents[1]
         self.dataset_path = dataset_path or Path(
-            os.getenv("RAG_DATASET_PATH", base_dir / "data" / "legalease_rag_dataset_clean.json")
+            os.getenv("RAG_DATASET_PATH", base_dir / "data" / "legalease_rag_dataset_clean.jsonl")
         )
+        if not self.dataset_path.exists() and self.dataset_path.with_suffix(".json").exists():
+            self.dataset_path = self.dataset_path.with_suffix(".json")
         self.index_path = index_path or Path(
-            os.getenv("RAG_INDEX_PATH", base_dir / "data" / "rag_index.npz")
+            os.getenv("RAG_INDEX_PATH", base_dir / "data" / "rag_index.npy")
         )
         self.metadata_path = metadata_path or Path(
             os.getenv("RAG_METADATA_PATH", base_dir / "data" / "rag_metadata.json")
         )
+        self.ann_index_path = ann_index_path or Path(
+            os.getenv("RAG_ANN_INDEX_PATH", self.index_path.with_name(f"{self.index_path.stem}_ivf.npz"))
+        )
+        self.index_dir = index_dir or Path(
+            os.getenv("RAG_INDEX_DIR", self.index_path.parent / "rag_index")
+        )
+        # Other API workers may still map the previous version until they notice the new CURRENT pointer.
+        self.keep_versions = max(2, int(os.getenv("RAG_INDEX_KEEP_VERSIONS", "2")))
         self.embedding_model_id = embedding_model_id or os.getenv(
             "RAG_EMBEDDING_MODEL", "intfloat/multilingual-e5-small"
         )
+        self.embedding_backend = os.getenv("RAG_EMBEDDING_BACKEND", "torch").lower()
+        if self.embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(
+                f"Unsupported RAG embedding backend '{self.embedding_backend}'. Use one of: {', '.join(EMBEDDING_BACKENDS)}"
+            )
+        self.onnx_quantization = os.getenv("RAG_ONNX_QUANTIZATION", "none").lower()
+        self.onnx_dir = Path(
+            os.getenv("RAG_ONNX_DIR", base_dir / "data" / "onnx" / self.embedding_model_id.replace("/", "__"))
+        )
+        self.backend_min_cosine = float(os.getenv("RAG_BACKEND_MIN_COSINE", "0.99"))
+        self.search_mode = (search_mode or os.getenv("RAG_SEARCH_MODE", "exact")).lower()
+        if self.search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported RAG search mode '{self.search_mode}'. Use one of: {', '.join(SEARCH_MODES)}")
+        self.storage_mode = (storage_mode or os.getenv("RAG_STORAGE_MODE", "float32")).lower()
+        if self.storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unsupported RAG storage mode '{self.storage_mode}'. Use one of: {', '.join(STORAGE_MODES)}")
+        self.rescore_factor = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+        self.hybrid_candidates = int(os.getenv("RAG_HYBRID_CANDIDATES", "50"))
+        self.route_domains = int(os.getenv("RAG_ROUTE_DOMAINS", "0"))
+        self.query_cache = TTLCache(
+            max_size=int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("RAG_QUERY_CACHE_TTL", "3600")),
+        )
+        embed_batch_size = int(os.getenv("RAG_EMBED_BATCH_SIZE", "16"))
+        self.query_batcher: Optional[EmbeddingBatcher] = None
+        if embed_batch_size > 1:
+            self.query_batcher = EmbeddingBatcher(
+                self._encode_query_batch,
+                max_batch_size=embed_batch_size,
+                max_wait_ms=float(os.getenv("RAG_EMBED_BATCH_WAIT_MS", "2")),
+            )
+        self.citation_max_chunks = int(os.getenv("RAG_CITATION_MAX_CHUNKS", "4"))
+        self.rerank_enabled = os.getenv("RAG_RERANK", "0") == "1"
+        self.rerank_candidates = int(os.getenv("RAG_RERANK_CANDIDATES", "20"))
+        self.rerank_budget_ms = float(os.getenv("RAG_RERANK_BUDGET_MS", "150"))
+        self.reranker = CrossEncoderReranker(
+            os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+            batch_size=int(os.getenv("RAG_RERANK_BATCH_SIZE", "4")),
+        )
         self.model: Optional[SentenceTransformer] = None
-        self.embeddings: Optional[np.ndarray] = None
-        self.metadata: Optional[List[Dict[str, Any]]] = None
+        self.snapshot: Optional[IndexSnapshot] = None
+        self._pointer_mtime: Optional[int] = None
+        self._reload_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._jobs_lock = threading.Lock()
+        self._jobs: Dict[str, IndexBuildJob] = {}
+        self._active_job: Optional[IndexBuildJob] = None
 
-        if self.index_path.exists() and self.metadata_path.exists():
+        if self._current_paths() is not None:
             self._load_index()
 
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        snapshot = self._current_snapshot()
+        return snapshot.embeddings if snapshot is not None else None
+
+    @property
+    def metadata(self) -> Optional[List[Dict[str, Any]]]:
+        snapshot = self._current_snapshot()
+        return snapshot.metadata if snapshot is not None else None
+
+    @property
+    def index_version(self) -> Optional[int]:
+        snapshot = self._current_snapshot()
+        return snapshot.version if snapshot is not None else None
+
+    def _current_snapshot(self) -> Optional[IndexSnapshot]:
+        # Another worker process may have published a build; one stat() per call notices the new pointer.
+        try:
+            mtime = (self.index_dir / "CURRENT").stat().st_mtime_ns
+        except OSError:
+            return self.snapshot
+        if mtime == self._pointer_mtime:
+            return self.snapshot
+        # Only the first request to notice reloads; the others keep serving the snapshot they have.
+        if not self._reload_lock.acquire(blocking=self.snapshot is None):
+            return self.snapshot
+        try:
+            if mtime != self._pointer_mtime:
+                self._pointer_mtime = mtime
+                version = self._current_version()
+                if version is not None and (self.snapshot is None or self.snapshot.source != version):
+                    try:
+                        self._load_index()
+                    except Exception:
+                        logging.getLogger("uvicorn.error").exception("Reloading RAG index %s failed", version)
+        finally:
+            self._reload_lock.release()
+        return self.snapshot
+
+    def _current_version(self) -> Optional[str]:
+        pointer = self.index_dir / "CURRENT"
+        if not pointer.exists():
+            return None
+        name = pointer.read_text(encoding="utf-8").strip()
+        return name if name and (self.index_dir / name).is_dir() else None
+
+    def _current_paths(self) -> Optional[IndexPaths]:
+        version = self._current_version()
+        if version is not None:
+            return IndexPaths.in_directory(self.index_dir / version)
+        # Flat files written before versioned builds existed.
+        legacy = IndexPaths(self.index_path, self.metadata_path, self.ann_index_path)
+        return legacy if legacy.exists() else None
+
     def _load_model(self) -> None:
-        if self.model is None:
-            logger = logging.getLogger("uvicorn.error")
-            logger.info("Loading embedding model %s...", self.embedding_model_id)
-            started = time.time()
-            self.model = SentenceTransformer(self.embedding_model_id)
-            logger.info("Embedding model loaded in %.1fs.", time.time() - started)
+        with self._model_lock:
+            if self.model is None:
+                logger = logging.getLogger("uvicorn.error")
+                logger.info("Loading embedding model %s (%s)...", self.embedding_model_id, self.embedding_backend)
+                started = time.time()
+                self.model = load_embedding_model(
+                    self.embedding_model_id,
+                    self.embedding_backend,
+                    self.onnx_quantization,
+                    self.onnx_dir,
+                )
+                # Cached vectors belong to whichever model produced them.
+                self.query_cache.clear()
+                logger.info("Embedding model loaded in %.1fs.", time.time() - started)
+
+    def _load_snapshot(self, paths: IndexPaths) -> IndexSnapshot:
+        logger = logging.getLogger("uvicorn.error")
+        store_path = paths.embedding_store()
+        if store_path != paths.embeddings:
+            logger.warning("Loading legacy compressed index %s; run /rag/build to write %s.", store_path, paths.embeddings)
+        manifest = _read_json(paths.manifest)
+        snapshot = IndexSnapshot(
+            version=int(manifest.get("version", 0)),
+            embeddings=load_embeddings(store_path),
+            metadata=json.loads(paths.metadata.read_text(encoding="utf-8")),
+            source=paths.metadata.parent.name,
+        )
+        if paths.ann_index.exists():
+            snapshot.ann_index = IVFIndex.load(paths.ann_index)
+        if paths.lexical_index.exists():
+            snapshot.lexical_index = BM25Index.load(paths.lexical_index)
+        if paths.partitions.exists():
+            snapshot.partitions = PartitionIndex.load(paths.partitions)
+        snapshot.sections = SectionIndex.build(snapshot.metadata)
+        if self.storage_mode != "float32":
+            snapshot.compact_embeddings = CompactEmbeddings.load(paths.embeddings, self.storage_mode)
+            if snapshot.compact_embeddings is None:
+                logger.warning("No %s embedding store found; scanning float32 until /rag/build runs.", self.storage_mode)
+            elif self.storage_mode in MEMORY_ONLY_MODES:
+                logger.info("%s storage saves memory only; its scans are slower than float32.", self.storage_mode)
+        return snapshot
+
+    def _lease_path(self) -> Path:
+        return self.index_dir / "leases" / f"{os.getpid()}.json"
+
+    def _use_snapshot(self, snapshot: IndexSnapshot) -> None:
+        self.snapshot = snapshot
+        # The lease tells builds in other workers which version this process still has mapped.
+        atomic_write_json(self._lease_path(), {"pid": os.getpid(), "version": snapshot.source})
+
+    def _leased_versions(self) -> Set[str]:
+        leased: Set[str] = set()
+        for lease in (self.index_dir / "leases").glob("*.json"):
+            payload = _read_json(lease)
+            pid = payload.get("pid")
+            if not isinstance(pid, int) or not psutil.pid_exists(pid):
+                lease.unlink(missing_ok=True)
+                continue
+            if payload.get("version"):
+                leased.add(payload["version"])
+        return leased
 
     def _load_index(self) -> None:
         logger = logging.getLogger("uvicorn.error")
         started = time.time()
-        data = np.load(self.index_path)
-        self.embeddings = data["embeddings"].astype(np.float32)
-        self.metadata = json.loads(self.metadata_path.read_text(encoding="utf-8"))
-        logger.info("RAG index loaded in %.1fs (%s items).", time.time() - started, len(self.metadata))
+        paths = self._current_paths()
+        if paths is None:
+            raise FileNotFoundError("RAG index files not found. Run /rag/build first.")
+        self._use_snapshot(self._load_snapshot(paths))
+        logger.info(
+            "RAG index v%s loaded in %.1fs (%s items).",
+            self.snapshot.version,
+            time.time() - started,
+            len(self.snapshot.metadata),
+        )
 
     def preload(self) -> None:
         logger = logging.getLogger("uvicorn.error")
         logger.info("Preloading RAG index and embedding model...")
-        if self.embeddings is None or self.metadata is None:
-            if not (self.index_path.exists() and self.metadata_path.exists()):
-                raise FileNotFoundError("RAG index files not found. Run /rag/build first.")
+        if self._current_snapshot() is None:
             self._load_index()
         self._load_model()
+        if self.rerank_enabled:
+            self.reranker.load()
         logger.info("RAG preload complete.")
 
     def _format_query(self, query: str) -> str:
@@ -73,72 +414,582 @@ class RetrievalService:
             return f"passage: {passage}"
         return passage
 
-    def build_index(self, batch_size: int = 32) -> Dict[str, Any]:
-        if not self.dataset_path.exists():
-            raise FileNotFoundError(f"Dataset not found at {self.dataset_path}")
+    def _content_hash(self, passage: str) -> str:
+        return hashlib.sha256(f"{self.embedding_model_id}\n{passage}".encode("utf-8")).hexdigest()
 
-        self._load_model()
-        records = json.loads(self.dataset_path.read_text(encoding="utf-8"))
+    def _previous_embeddings(self) -> Tuple[Dict[str, int], Optional[np.ndarray], Set[str]]:
+        snapshot = self._current_snapshot()
+        if snapshot is None:
+            if self._current_paths() is None:
+                return {}, None, set()
+            self._load_index()
+            snapshot = self.snapshot
+        rows: Dict[str, int] = {}
+        hashes_path = self._current_paths().content_hashes
+        content_hashes = json.loads(hashes_path.read_text(encoding="utf-8")) if hashes_path.exists() else []
+        if len(content_hashes) == len(snapshot.metadata):
+            for row, content_hash in enumerate(content_hashes):
+                rows.setdefault(content_hash, row)
+        chunk_ids = {item.get("chunk_id") for item in snapshot.metadata}
+        return rows, snapshot.embeddings, chunk_ids
 
-        passages = [self._format_passage(item["text"]) for item in records]
-        embeddings = self.model.encode(
-            passages,
-            batch_size=batch_size,
-            show_progress_bar=True,
-            normalize_embeddings=True,
+    def _embed_records(
+        self,
+        metadata: List[Dict[str, Any]],
+        content_hashes: List[str],
+        output_path: Path,
+        batch_size: int,
+        full_rebuild: bool,
+        job: Optional[IndexBuildJob] = None,
+    ) -> Tuple[Dict[str, int], Set[str]]:
+        previous_rows, previous_embeddings, previous_chunk_ids = (
+            ({}, None, set()) if full_rebuild else self._previous_embeddings()
         )
+        reuse = [previous_rows.get(content_hash) for content_hash in content_hashes]
+        reused_idx = [idx for idx, row in enumerate(reuse) if row is not None]
+        missing = [idx for idx, row in enumerate(reuse) if row is None]
 
-        embeddings = np.asarray(embeddings, dtype=np.float32)
-        self.index_path.parent.mkdir(parents=True, exist_ok=True)
-        np.savez_compressed(self.index_path, embeddings=embeddings)
+        if reused_idx:
+            dim = previous_embeddings.shape[1]
+        else:
+            self._load_model()
+            dim = self.model.get_sentence_embedding_dimension()
 
-        minimal_metadata = [
-            {
-                "chunk_id": item.get("chunk_id"),
-                "law_name": item.get("law_name"),
-                "domain": item.get("domain"),
-                "jurisdiction": item.get("jurisdiction"),
-                "section_id": item.get("section_id"),
-                "section_title": item.get("section_title"),
-                "text": item.get("text"),
-            }
-            for item in records
+        # Write straight into the on-disk matrix so the build never holds a second full copy in RAM.
+        embeddings = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32, shape=(len(metadata), dim))
+        step = max(batch_size * 8, 1)
+        for start in range(0, len(reused_idx), step):
+            rows = reused_idx[start:start + step]
+            embeddings[rows] = previous_embeddings[[reuse[idx] for idx in rows]]
+        if missing:
+            self._load_model()
+        for start in range(0, len(missing), step):
+            rows = missing[start:start + step]
+            passages = [self._format_passage(metadata[idx]["text"]) for idx in rows]
+            embeddings[rows] = np.asarray(
+                self.model.encode(passages, batch_size=batch_size, normalize_embeddings=True),
+                dtype=np.float32,
+            )
+            if job is not None:
+                job.update("embedding", 0.05 + 0.75 * min(start + step, len(missing)) / len(missing))
+        embeddings.flush()
+        del embeddings
+        stats = {"reused_chunks": len(reused_idx), "encoded_chunks": len(missing)}
+        return stats, previous_chunk_ids
+
+    def _next_version(self) -> int:
+        versions = [
+            int(path.name[1:])
+            for path in self.index_dir.glob("v*")
+            if path.is_dir() and path.name[1:].isdigit()
         ]
-        self.metadata_path.write_text(
-            json.dumps(minimal_metadata, ensure_ascii=False, indent=2),
-            encoding="utf-8",
+        current = self.snapshot.version if self.snapshot is not None else 0
+        return max(versions + [current]) + 1
+
+    def _publish_version(self, staging_dir: Path, version: int) -> Path:
+        version_dir = self.index_dir / f"v{version:06d}"
+        os.replace(staging_dir, version_dir)
+        with atomic_output(self.index_dir / "CURRENT", mode="w") as handle:
+            handle.write(version_dir.name)
+        return version_dir
+
+    def _prune_versions(self, keep: Set[str]) -> None:
+        keep = keep | self._leased_versions()
+        versions = sorted(
+            (path for path in self.index_dir.glob("v*") if path.is_dir() and path.name[1:].isdigit()),
+            key=lambda path: path.name,
         )
+        for path in versions[:-self.keep_versions]:
+            if path.name in keep:
+                continue
+            # Windows refuses to delete files that are still memory-mapped; retry on the next build.
+            shutil.rmtree(path, ignore_errors=True)
+        # Builds hold the build lock, so any staging directory left now belongs to a build that crashed.
+        for path in self.index_dir.glob(".building-*"):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def build_index(
+        self,
+        batch_size: int = 32,
+        full_rebuild: bool = False,
+        job: Optional[IndexBuildJob] = None,
+    ) -> Dict[str, Any]:
+        if not self.dataset_path.exists():
+            raise FileNotFoundError(f"Dataset not found at {self.dataset_path}")
+
+        with self._build_lock:
+            lock = self._build_file_lock()
+            lock.acquire()
+            try:
+                self._set_build_owner(job)
+                return self._build_index(batch_size, full_rebuild, job)
+            finally:
+                lock.release()
+
+    def _build_file_lock(self) -> InterProcessLock:
+        # Serializes version numbering, staging and publishing across every worker sharing index_dir.
+        return InterProcessLock(self.index_dir / "build.lock")
+
+    def _set_build_owner(self, job: Optional[IndexBuildJob]) -> None:
+        atomic_write_json(self.index_dir / "build.owner.json", {"pid": os.getpid(), "job_id": job.job_id if job else None})
+
+    def _dataset_documents(self, dataset_sha256: str) -> Dict[str, str]:
+        # Per-document hashes written by the ingestion scripts, trusted only if they describe this exact file.
+        ingestion = IngestionManifest.load(manifest_path(self.dataset_path))
+        if ingestion is None or ingestion.output_sha256 != dataset_sha256:
+            return {}
+        return {doc_id: entry.get("output_hash") for doc_id, entry in ingestion.documents.items()}
+
+    def _build_index(self, batch_size: int, full_rebuild: bool, job: Optional[IndexBuildJob]) -> Dict[str, Any]:
+        stage_seconds: Dict[str, float] = {}
+        stage_clock = {"stage": None, "started": time.time()}
+
+        def report(stage: str, progress: float) -> None:
+            now = time.time()
+            if stage_clock["stage"] is not None:
+                stage_seconds[stage_clock["stage"]] = round(now - stage_clock["started"], 3)
+            stage_clock.update(stage=stage, started=now)
+            if job is not None:
+                job.update(stage, progress)
+
+        started = time.time()
+        report("loading dataset", 0.0)
+        dataset_sha256 = file_sha256(self.dataset_path)
+        current_paths = self._current_paths()
+        current_manifest = _read_json(current_paths.manifest) if current_paths is not None else {}
+        if (
+            not full_rebuild
+            and current_manifest.get("dataset_sha256") == dataset_sha256
+            and current_manifest.get("embedding_model") == self.embedding_model_id
+        ):
+            if self.snapshot is None:
+                self._load_index()
+            report("done", 1.0)
+            return {
+                "index_version": self.snapshot.version,
+                "indexed_chunks": len(self.snapshot.metadata),
+                "skipped": True,
+                "reason": "dataset and embedding model unchanged",
+                "build_seconds": round(time.time() - started, 2),
+                "embedding_model": self.embedding_model_id,
+                "index_path": str(current_paths.embeddings.parent),
+            }
+
+        dataset_documents = self._dataset_documents(dataset_sha256)
+        previous_documents = current_manifest.get("dataset_documents") or {}
+        changed_documents: Optional[List[str]] = None
+        removed_documents: Optional[List[str]] = None
+        if dataset_documents and previous_documents:
+            changed_documents = sorted(
+                doc_id for doc_id, digest in dataset_documents.items() if previous_documents.get(doc_id) != digest
+            )
+            removed_documents = sorted(set(previous_documents) - set(dataset_documents))
+
+        metadata = [_minimal_record(item) for item in iter_records(self.dataset_path)]
+        # Group rows by domain/statute so every partition is a contiguous slice of the matrix.
+        metadata.sort(key=partition_sort_key)
+        # Kept beside the metadata, not in it, so the hashes never reach search results.
+        content_hashes = [self._content_hash(self._format_passage(item["text"])) for item in metadata]
+
+        backend_check: Optional[Dict[str, Any]] = None
+        if self.embedding_backend != "torch" and metadata:
+            report("verifying backend", 0.02)
+            self._load_model()
+            sample = metadata[:: max(1, len(metadata) // 32)][:32]
+            backend_check = verify_backend(
+                self.model,
+                self.embedding_model_id,
+                [self._format_passage(item["text"]) for item in sample],
+                self.backend_min_cosine,
+            )
+            if not backend_check["passed"]:
+                raise RuntimeError(
+                    f"{self.embedding_backend} embeddings drift from the torch model "
+                    f"(min cosine {backend_check['min_cosine']} < {self.backend_min_cosine}); "
+                    "lower RAG_BACKEND_MIN_COSINE or change RAG_ONNX_QUANTIZATION."
+                )
+
+        version = self._next_version()
+        staging_dir = self.index_dir / f".building-v{version:06d}-{uuid.uuid4().hex[:8]}"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        paths = IndexPaths.in_directory(staging_dir)
+        try:
+            report("embedding", 0.05)
+            embed_stats, previous_chunk_ids = self._embed_records(
+                metadata, content_hashes, paths.embeddings, batch_size, full_rebuild, job
+            )
+            current_chunk_ids = {item.get("chunk_id") for item in metadata}
+            embed_stats["removed_chunks"] = len(previous_chunk_ids - current_chunk_ids)
+            embeddings = load_embeddings(paths.embeddings)
+
+            report("ann index", 0.82)
+            ann_index = IVFIndex.build(embeddings)
+            ann_index.save(paths.ann_index)
+            ann_recall = measure_recall(
+                embeddings,
+                lambda query, k: ann_index.search(embeddings, query, k),
+            )
+
+            report("compact stores", 0.88)
+            storage_recall: Dict[str, float] = {}
+            storage_bytes: Dict[str, int] = {"float32": int(embeddings.nbytes)}
+            storage_search_ms: Dict[str, float] = {
+                "float32": round(measure_latency_ms(embeddings, lambda query, k: exact_search(embeddings, query, k)), 3)
+            }
+            for mode in STORAGE_MODES[1:]:
+                compact = CompactEmbeddings.from_embeddings(embeddings, mode)
+                compact.save(paths.embeddings)
+                storage_bytes[mode] = compact.nbytes
+                search_fn = partial(rescored_search, compact, embeddings, rescore_factor=self.rescore_factor)
+                storage_recall[mode] = round(measure_recall(embeddings, search_fn), 4)
+                storage_search_ms[mode] = round(measure_latency_ms(embeddings, search_fn), 3)
+
+            atomic_write_json(paths.metadata, metadata)
+            atomic_write_json(paths.content_hashes, content_hashes)
+
+            report("lexical index", 0.93)
+            lexical_index = BM25Index.build([item.get("text") or "" for item in metadata])
+            lexical_index.save(paths.lexical_index)
+
+            report("partitions", 0.96)
+            partitions = PartitionIndex.build(metadata, embeddings)
+            partitions.save(paths.partitions)
+            route_domains = self.route_domains or 2
+            routing_recall = measure_recall(
+                embeddings,
+                lambda query, k: scan_ranges(
+                    embeddings,
+                    query,
+                    partitions.route(query, route_domains) or [(0, len(embeddings))],
+                    k,
+                ),
+            )
+
+            manifest = {
+                "version": version,
+                "embedding_model": self.embedding_model_id,
+                "embedding_backend": self.embedding_backend,
+                "backend_check": backend_check,
+                "chunks": len(metadata),
+                "built_at": datetime.now(timezone.utc).isoformat(),
+                "dataset_sha256": dataset_sha256,
+                "dataset_documents": dataset_documents,
+                **embed_stats,
+            }
+            atomic_write_json(paths.manifest, manifest)
+
+            report("swapping", 0.99)
+            version_dir = self._publish_version(staging_dir, version)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        # Searches already running keep the snapshot they grabbed; new ones see the new version.
+        self._use_snapshot(self._load_snapshot(IndexPaths.in_directory(version_dir)))
+        self._prune_versions(keep={version_dir.name})
+        report("done", 1.0)
 
-        self.embeddings = embeddings
-        self.metadata = minimal_metadata
         return {
-            "indexed_chunks": len(minimal_metadata),
+            "index_version": version,
+            "indexed_chunks": len(metadata),
+            **embed_stats,
+            "changed_documents": changed_documents,
+            "removed_documents": removed_documents,
+            "build_seconds": round(time.time() - started, 2),
+            "stage_seconds": stage_seconds,
             "embedding_model": self.embedding_model_id,
-            "index_path": str(self.index_path),
+            "embedding_backend": self.embedding_backend,
+            "backend_check": backend_check,
+            "index_path": str(version_dir),
+            "ann_lists": ann_index.n_lists,
+            "ann_recall_at_10": round(ann_recall, 4),
+            "lexical_terms": len(lexical_index.vocabulary),
+            "partitions": {name: len(values) for name, values in partitions.ranges.items()},
+            "routing_domains": route_domains,
+            "routing_recall_at_10": round(routing_recall, 4),
+            "storage_mode": self.storage_mode,
+            "storage_recall_at_10": storage_recall,
+            "storage_bytes": storage_bytes,
+            "storage_search_ms": storage_search_ms,
         }
 
-    def search(self, query: str, top_k: int = 2) -> List[Dict[str, Any]]:
-        if self.embeddings is None or self.metadata is None:
-            raise ValueError("RAG index not built yet. Call build_index first.")
+    def _run_build_job(self, job: IndexBuildJob, batch_size: int, lock: InterProcessLock) -> None:
+        logger = logging.getLogger("uvicorn.error")
+        job.status = "running"
+        job.save()
+        try:
+            if not self.dataset_path.exists():
+                raise FileNotFoundError(f"Dataset not found at {self.dataset_path}")
+            # start_build already holds the cross-process lock on this job's behalf.
+            with self._build_lock:
+                job.result = self._build_index(batch_size, job.full_rebuild, job)
+            job.status = "succeeded"
+        except Exception as exc:
+            logger.exception("RAG index build %s failed", job.job_id)
+            job.status = "failed"
+            job.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            job.finished_at = datetime.now(timezone.utc).isoformat()
+            job.save()
+            lock.release()
+
+    def _jobs_dir(self) -> Path:
+        return self.index_dir / "jobs"
+
+    def start_build(self, full_rebuild: bool = False, batch_size: int = 32) -> IndexBuildJob:
+        if not self.dataset_path.exists():
+            raise FileNotFoundError(f"Dataset not found at {self.dataset_path}")
+        with self._jobs_lock:
+            active = self._active_job
+            if active is not None and active.status in {"queued", "running"}:
+                return active
+            lock = self._build_file_lock()
+            if not lock.acquire(blocking=False):
+                return self._build_elsewhere()
+            job_id = uuid.uuid4().hex
+            job = IndexBuildJob(job_id=job_id, full_rebuild=full_rebuild, path=self._jobs_dir() / f"{job_id}.json")
+            try:
+                job.save()
+                self._set_build_owner(job)
+            except BaseException:
+                lock.release()
+                raise
+            self._jobs[job.job_id] = job
+            self._active_job = job
+            for stale in list(self._jobs)[:-20]:
+                self._jobs.pop(stale, None)
+            job_files = sorted(self._jobs_dir().glob("*.json"), key=lambda path: path.stat().st_mtime)
+            for stale_file in job_files[:-20]:
+                stale_file.unlink(missing_ok=True)
+        _BUILD_POOL.submit(self._run_build_job, job, batch_size, lock)
+        return job
+
+    def _build_elsewhere(self) -> IndexBuildJob:
+        owner = _read_json(self.index_dir / "build.owner.json")
+        job = self._load_job(owner["job_id"]) if owner.get("job_id") else None
+        if job is None or job.status not in {"queued", "running"}:
+            raise RuntimeError("Another process is building the RAG index; retry once it finishes.")
+        return job
+
+    def _load_job(self, job_id: str) -> Optional[IndexBuildJob]:
+        path = self._jobs_dir() / f"{job_id}.json"
+        payload = _read_json(path)
+        if payload.get("job_id") != job_id:
+            return None
+        job = IndexBuildJob.from_dict(payload, path=path)
+        if job.status in {"queued", "running"} and not (job.pid and psutil.pid_exists(job.pid)):
+            job.status = "failed"
+            job.error = "The worker running this build exited before it finished."
+            job.finished_at = datetime.now(timezone.utc).isoformat()
+            job.save()
+        return job
+
+    def get_build_job(self, job_id: str) -> Optional[IndexBuildJob]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if not job_id.isalnum():
+            return None
+        # Started by another worker process.
+        return self._load_job(job_id)
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        cache_key = (self.embedding_model_id, _normalize_query(query))
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        self._load_model()
         query_text = self._format_query(query)
-        query_embedding = self.model.encode(
-            [query_text],
+        if self.query_batcher is not None:
+            embedding = self.query_batcher.encode(query_text)
+        else:
+            embedding = self._encode_query_batch([query_text])[0]
+        embedding.flags.writeable = False
+        self.query_cache.put(cache_key, embedding)
+        return embedding
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return self._encode_query(query)
+
+    def _encode_query_batch(self, query_texts: List[str]) -> np.ndarray:
+        self._load_model()
+        embeddings = self.model.encode(
+            query_texts,
+            batch_size=len(query_texts),
             normalize_embeddings=True,
-        )[0]
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def batching_stats(self) -> Dict[str, Any]:
+        if self.query_batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.query_batcher.stats()}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"embedding_model": self.embedding_model_id, **self.query_cache.stats()}
+
+    def _select_ranges(
+        self,
+        snapshot: IndexSnapshot,
+        filters: Optional[Dict[str, List[str]]],
+    ) -> Optional[List[Range]]:
+        if not filters or not any(filters.values()):
+            return None
+        if snapshot.partitions is None:
+            raise ValueError("Filtered search needs the partition index. Run /rag/build first.")
+        return snapshot.partitions.select(filters)
+
+    def _dense_search(
+        self,
+        snapshot: IndexSnapshot,
+        query_embedding: np.ndarray,
+        top_k: int,
+        mode: str,
+        ranges: Optional[List[Range]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if ranges is not None:
+            return scan_ranges(snapshot.embeddings, query_embedding, ranges, top_k)
+        if mode == "exact" and self.route_domains and snapshot.partitions is not None:
+            routed = snapshot.partitions.route(query_embedding, self.route_domains)
+            if routed is not None:
+                return scan_ranges(snapshot.embeddings, query_embedding, routed, top_k)
+        if mode == "ivf" and snapshot.ann_index is not None:
+            return snapshot.ann_index.search(snapshot.embeddings, query_embedding, top_k)
+        if snapshot.compact_embeddings is not None:
+            return rescored_search(
+                snapshot.compact_embeddings,
+                snapshot.embeddings,
+                query_embedding,
+                top_k,
+                self.rescore_factor,
+            )
+        return exact_search(snapshot.embeddings, query_embedding, top_k)
+
+    def _hybrid_search(
+        self,
+        snapshot: IndexSnapshot,
+        query: str,
+        query_embedding: np.ndarray,
+        top_k: int,
+        ranges: Optional[List[Range]] = None,
+    ) -> List[Dict[str, Any]]:
+        dense_mode = self.search_mode if self.search_mode != "hybrid" else "exact"
+        candidates = max(top_k, self.hybrid_candidates)
+        dense_ids, _ = self._dense_search(snapshot, query_embedding, candidates, dense_mode, ranges)
+        rankings = [dense_ids.tolist()]
+        lexical_scores: Dict[int, float] = {}
+        if snapshot.lexical_index is not None:
+            lexical_ids, bm25_scores = snapshot.lexical_index.search(query, candidates if ranges is None else candidates * 4)
+            if ranges is not None:
+                keep = in_ranges(lexical_ids, ranges)
+                lexical_ids, bm25_scores = lexical_ids[keep][:candidates], bm25_scores[keep][:candidates]
+            rankings.append(lexical_ids.tolist())
+            lexical_scores = dict(zip(lexical_ids.tolist(), bm25_scores.tolist()))
+
+        fused = reciprocal_rank_fusion(rankings)[:top_k]
+        if not fused:
+            return []
+        fused_ids = np.asarray([doc_id for doc_id, _ in fused], dtype=np.int64)
+        # Keep cosine as the primary score so referral thresholds mean the same thing in every mode.
+        cosine = np.dot(np.asarray(snapshot.embeddings[fused_ids], dtype=np.float32), query_embedding)
+        results = []
+        for (doc_id, rrf_score), score in zip(fused, cosine):
+            item = dict(snapshot.metadata[doc_id])
+            item["score"] = float(score)
+            item["bm25_score"] = float(lexical_scores.get(doc_id, 0.0))
+            item["rrf_score"] = float(rrf_score)
+            results.append(item)
+        return results
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 2,
+        mode: Optional[str] = None,
+        filters: Optional[Dict[str, List[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        snapshot = self._current_snapshot()
+        if snapshot is None:
+            raise ValueError("RAG index not built yet. Call build_index first.")
+        mode = (mode or self.search_mode).lower()
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}")
+
+        ranges = self._select_ranges(snapshot, filters)
+        if ranges is not None and not ranges:
+            return []
 
-        scores = np.dot(self.embeddings, query_embedding)
-        top_k = max(1, min(top_k, len(scores)))
-        best_indices = np.argsort(scores)[-top_k:][::-1]
+        query_embedding = self._encode_query(query)
+        if mode == "hybrid":
+            return self._hybrid_search(snapshot, query, query_embedding, top_k, ranges)
+
+        best_indices, best_scores = self._dense_search(snapshot, query_embedding, top_k, mode, ranges)
+        results = []
+        for idx, score in zip(best_indices, best_scores):
+            item = dict(snapshot.metadata[idx])
+            item["score"] = float(score)
+            results.append(item)
+        return results
 
+    def lookup_citations(
+        self,
+        query: str,
+        top_k: int = 2,
+        filters: Optional[Dict[str, List[str]]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        snapshot = self._current_snapshot()
+        if snapshot is None or snapshot.sections is None:
+            return None
+        default_law = None
+        law_filter = (filters or {}).get("law_name") or []
+        if len(law_filter) == 1:
+            laws = snapshot.sections.cited_laws(law_filter[0])
+            default_law = laws[0] if len(laws) == 1 else None
+        rows = snapshot.sections.lookup(query, default_law)
+        if rows is None:
+            return None
+        try:
+            ranges = self._select_ranges(snapshot, filters)
+        except ValueError:
+            # Let the regular search report the missing partition index.
+            return None
+        if ranges is not None:
+            # A law named in the query must not bypass the request's law/domain filter.
+            rows = [row for row, keep in zip(rows, in_ranges(np.asarray(rows, dtype=np.int64), ranges)) if keep]
+            if not rows:
+                return None
         results = []
-        for idx in best_indices:
-            item = dict(self.metadata[idx])
-            item["score"] = float(scores[idx])
+        for row in rows[:max(top_k, self.citation_max_chunks)]:
+            item = dict(snapshot.metadata[row])
+            # An exact statutory reference is as relevant as retrieval gets.
+            item["score"] = 1.0
+            item["match"] = "citation"
             results.append(item)
         return results
 
+    def search_with_rerank(
+        self,
+        query: str,
+        top_k: int = 2,
+        mode: Optional[str] = None,
+        filters: Optional[Dict[str, List[str]]] = None,
+        rerank: Optional[bool] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        if not (self.rerank_enabled if rerank is None else rerank):
+            return self.search(query, top_k=top_k, mode=mode, filters=filters), None
+        candidates = self.search(query, top_k=max(top_k, self.rerank_candidates), mode=mode, filters=filters)
+        if not candidates:
+            return [], None
+        return self.reranker.rerank(query, candidates, top_k, self.rerank_budget_ms)
+
+    def rerank_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.rerank_enabled,
+            "candidates": self.rerank_candidates,
+            "budget_ms": self.rerank_budget_ms,
+            **self.reranker.stats(),
+        }
+
 
 _retrieval_service: Optional[RetrievalService] = None
 
@@ -3,6 +3,8 @@ import json
 import re
 from typing import Any, Dict
 
+from backend.services.llm_service import register_prompt_prefix
+
 
 RISK_KEYWORDS = (
 	"liability",
@@ -28,6 +30,23 @@ MISSING_CLAUSE_FALLBACKS = [
 	("Dispute resolution and jurisdiction terms are missing.", "Medium", "Without forum and process, conflicts can become costly and prolonged."),
 ]
 
+RISK_INSTRUCTIONS = (
+	"You are a legal risk analyzer. "
+	"Your task is to STRICTLY identify risky clauses in the document. "
+	"You MUST always return at least 3 potential risks, even when confidence is low. "
+	"If explicit risks are limited, return missing-clause risks (termination, liability, jurisdiction, dispute resolution, penalties). "
+	"For each risk, quote exact clause text when available; otherwise state the likely missing clause. "
+	"Return output ONLY as valid JSON with this exact schema and no extra keys: "
+	"{\"summary\": string, "
+	"\"risky_clauses\": [{\"clause\": string, \"risk\": string, \"severity\": \"Low\"|\"Medium\"|\"High\", \"reason\": string, \"confidence\": number}], "
+	"\"compliance_issues\": [{\"issue\": string, \"reason\": string}], "
+	"\"recommendations\": [string]}. "
+	"confidence must be a decimal between 0 and 1. "
+	"Do not output markdown or prose outside JSON."
+	"\n\nDocument excerpt:\n"
+)
+register_prompt_prefix("document_review", RISK_INSTRUCTIONS)
+
 
 def _safe_json_parse(raw: str) -> Dict[str, Any]:
 	try:
@@ -184,22 +203,7 @@ async def analyze_risks(text: str, llm) -> Dict[str, Any]:
 	if not excerpt:
 		excerpt = (text or "").strip()[:12000]
 
-	prompt = (
-		"You are a legal risk analyzer. "
-		"Your task is to STRICTLY identify risky clauses in the document. "
-		"You MUST always return at least 3 potential risks, even when confidence is low. "
-		"If explicit risks are limited, return missing-clause risks (termination, liability, jurisdiction, dispute resolution, penalties). "
-		"For each risk, quote exact clause text when available; otherwise state the likely missing clause. "
-		"Return output ONLY as valid JSON with this exact schema and no extra keys: "
-		"{\"summary\": string, "
-		"\"risky_clauses\": [{\"clause\": string, \"risk\": string, \"severity\": \"Low\"|\"Medium\"|\"High\", \"reason\": string, \"confidence\": number}], "
-		"\"compliance_issues\": [{\"issue\": string, \"reason\": string}], "
-		"\"recommendations\": [string]}. "
-		"confidence must be a decimal between 0 and 1. "
-		"Do not output markdown or prose outside JSON."
-		"\n\nDocument excerpt:\n"
-		f"{excerpt}"
-	)
+	prompt = f"{RISK_INSTRUCTIONS}{excerpt}"
 	try:
 		raw = await asyncio.wait_for(llm.generate(prompt, max_new_tokens=512), timeout=480)
 	except asyncio.TimeoutError:
@@ -0,0 +1,90 @@
+import re
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+CITATION_PATTERN = re.compile(
+    r"(?:\bsections?|\bsec\.?|\bs\.|§)\s*"
+    r"(?P<ids>\d+[A-Za-z]*(?:\s*(?:,|&|\band\b|\bor\b)\s*\d+[A-Za-z]*)*)",
+    re.IGNORECASE,
+)
+SECTION_ID_PATTERN = re.compile(r"\d+[A-Za-z]*")
+YEAR_SUFFIX_PATTERN = re.compile(r",?\s*\d{4}$")
+
+
+def _normalize_section(section_id: str) -> str:
+    return str(section_id or "").strip().lower()
+
+
+def law_aliases(law_name: str) -> Set[str]:
+    name = " ".join(law_name.lower().split())
+    aliases = {name, name.replace(",", "")}
+    # "Contract Act, 1872" is usually cited as just "Contract Act".
+    base = YEAR_SUFFIX_PATTERN.sub("", name).strip()
+    if base:
+        aliases.add(base)
+    return aliases
+
+
+def cited_sections(query: str) -> List[str]:
+    sections: List[str] = []
+    for match in CITATION_PATTERN.finditer(query or ""):
+        for section_id in SECTION_ID_PATTERN.findall(match.group("ids")):
+            key = _normalize_section(section_id)
+            if key not in sections:
+                sections.append(key)
+    return sections
+
+
+class SectionIndex:
+    def __init__(self, sections: Dict[Tuple[str, str], List[int]], laws: Sequence[str]) -> None:
+        self.sections = sections
+        self._aliases: List[Tuple[re.Pattern, str]] = []
+        for law_name in laws:
+            for alias in law_aliases(law_name):
+                self._aliases.append((re.compile(rf"\b{re.escape(alias)}\b"), law_name))
+        # Try longer aliases first so "income tax ordinance, 2001" wins over its own prefix.
+        self._aliases.sort(key=lambda pair: len(pair[0].pattern), reverse=True)
+
+    @classmethod
+    def build(cls, metadata: Sequence[Mapping[str, Any]]) -> "SectionIndex":
+        sections: Dict[Tuple[str, str], List[int]] = {}
+        laws: List[str] = []
+        seen_chunks: Set[Tuple[str, str]] = set()
+        for row, item in enumerate(metadata):
+            law_name = str(item.get("law_name") or "")
+            section_id = _normalize_section(item.get("section_id"))
+            if not law_name or not section_id:
+                continue
+            if law_name not in laws:
+                laws.append(law_name)
+            chunk_key = (law_name, str(item.get("chunk_id") or row))
+            if chunk_key in seen_chunks:
+                continue
+            seen_chunks.add(chunk_key)
+            sections.setdefault((law_name, section_id), []).append(row)
+        return cls(sections, laws)
+
+    def cited_laws(self, query: str) -> List[str]:
+        lowered = " ".join((query or "").lower().split())
+        laws: List[str] = []
+        for pattern, law_name in self._aliases:
+            if law_name not in laws and pattern.search(lowered):
+                laws.append(law_name)
+        return laws
+
+    def lookup(self, query: str, default_law: Optional[str] = None) -> Optional[List[int]]:
+        sections = cited_sections(query)
+        if not sections:
+            return None
+        laws = self.cited_laws(query)
+        if not laws and default_law is not None:
+            laws = [default_law]
+        # Every statute has a section 27, so only a single named law makes the citation unambiguous.
+        if len(laws) != 1:
+            return None
+        rows: List[int] = []
+        for section_id in sections:
+            section_rows = self.sections.get((laws[0], section_id))
+            if not section_rows:
+                return None
+            rows.extend(section_rows)
+        return rows
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+
+def iter_records(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        first = ""
+        while True:
+            char = handle.read(1)
+            if not char or not char.isspace():
+                first = char
+                break
+        handle.seek(0)
+        if first == "[":
+            # Datasets written before the JSONL switch are a single JSON array.
+            yield from json.load(handle)
+            return
+        for line in handle:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class JsonlWriter:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = 0
+        self._handle: Optional[TextIO] = None
+        self._temp_name: Optional[str] = None
+
+    def __enter__(self) -> "JsonlWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._temp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        self._handle = os.fdopen(fd, "w", encoding="utf-8", newline="\n")
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._handle.write(json.dumps(record, ensure_ascii=False))
+        self._handle.write("\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._handle.close()
+        if exc_type is None:
+            os.replace(self._temp_name, self.path)
+        else:
+            try:
+                os.remove(self._temp_name)
+            except OSError:
+                pass
@@ -0,0 +1,138 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.services.index_store import atomic_write_json
+from backend.utils.jsonl import iter_records
+
+
+def manifest_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.stem}.manifest.json")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def records_sha256(records: Iterable[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256()
+    for record in records:
+        # Keys starting with "__" are in-memory bookkeeping and never written out.
+        payload = {key: value for key, value in record.items() if not key.startswith("__")}
+        digest.update(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+@dataclass
+class IngestionManifest:
+    params: Dict[str, Any]
+    documents: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    changed_doc_ids: List[str] = field(default_factory=list)
+    removed_doc_ids: List[str] = field(default_factory=list)
+    output_sha256: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IngestionManifest"]:
+        if not path.exists():
+            return None
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return cls(
+            params=payload.get("params", {}),
+            documents=payload.get("documents", {}),
+            changed_doc_ids=payload.get("changed_doc_ids", []),
+            removed_doc_ids=payload.get("removed_doc_ids", []),
+            output_sha256=payload.get("output_sha256"),
+        )
+
+    @classmethod
+    def load_reusable(cls, output_path: Path, params: Dict[str, Any]) -> Optional["IngestionManifest"]:
+        previous = cls.load(manifest_path(output_path))
+        if previous is None or previous.params != params or not output_path.exists():
+            return None
+        # A hand-edited or partially copied output cannot be trusted record by record.
+        if previous.output_sha256 != file_sha256(output_path):
+            return None
+        return previous
+
+    def is_current(self, doc_id: str, input_hash: str) -> bool:
+        entry = self.documents.get(doc_id)
+        return entry is not None and entry.get("input_hash") == input_hash
+
+    def save(self, output_path: Path) -> None:
+        self.output_sha256 = file_sha256(output_path)
+        atomic_write_json(
+            manifest_path(output_path),
+            {
+                "params": self.params,
+                "output_sha256": self.output_sha256,
+                "changed_doc_ids": self.changed_doc_ids,
+                "removed_doc_ids": self.removed_doc_ids,
+                "documents": self.documents,
+            },
+        )
+
+
+class PreviousOutput:
+    # Walks the previous output forward; callers request documents in the order they were written.
+    def __init__(self, path: Optional[Path]) -> None:
+        self._records: Iterator[Dict[str, Any]] = iter_records(path) if path is not None else iter(())
+        self._groups = groupby(self._records, key=lambda record: record.get("doc_id"))
+
+    def take(self, doc_id: str) -> Optional[List[Dict[str, Any]]]:
+        for current, records in self._groups:
+            if current == doc_id:
+                return list(records)
+        return None
+
+    def close(self) -> None:
+        close = getattr(self._records, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self) -> "PreviousOutput":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def document_entry(input_hash: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"input_hash": input_hash, "output_hash": records_sha256(records), "records": len(records)}
+
+
+def reuse_records(
+    previous: Optional[IngestionManifest],
+    cursor: PreviousOutput,
+    doc_id: str,
+    input_hash: str,
+) -> Optional[List[Dict[str, Any]]]:
+    if previous is None or not previous.is_current(doc_id, input_hash):
+        return None
+    records = cursor.take(doc_id)
+    if records is None or records_sha256(records) != previous.documents[doc_id].get("output_hash"):
+        return None
+    return records
+
+
+def diff_documents(
+    previous: Optional[IngestionManifest], documents: Dict[str, Dict[str, Any]]
+) -> Tuple[List[str], List[str]]:
+    before = previous.documents if previous is not None else {}
+    changed = [
+        doc_id
+        for doc_id, entry in documents.items()
+        if before.get(doc_id, {}).get("output_hash") != entry["output_hash"]
+    ]
+    removed = sorted(set(before) - set(documents))
+    return changed, removed
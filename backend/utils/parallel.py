@@ -0,0 +1,17 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+def ordered_map(pool: Executor, fn: Callable[..., T], items: Iterable[Any], *args: Any, window: int) -> Iterator[T]:
+    # Unlike Executor.map, keeps at most `window` tasks in flight, so finished results cannot
+    # pile up in the parent when the consumer is slower than the workers.
+    pending: Deque[Future] = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()